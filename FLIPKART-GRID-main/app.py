@@ -1,15 +1,144 @@
-from flask import Flask, render_template, request, jsonify
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    request,
+    jsonify,
+    stream_with_context,
+)
 from flask_socketio import SocketIO
-import cv2
-import numpy as np
+from werkzeug.middleware.proxy_fix import ProxyFix
+import json
+import os
+import sys
+import zipfile
+import time
 import base64
-from io import BytesIO
-from PIL import Image
-import matplotlib.pyplot as plt
-from src.controller.analyze_image import imageResults
+from src.controller.admission import (
+    ADMISSION_LATEST_FRAME_WINS,
+    admission_stats,
+    deadline_context,
+    request_deadline,
+)
+from src.controller.batch_upload import BatchTooLarge, decode_uploads, iter_uploaded_images
+from src.controller.capture_archive import archive_frame, capture_archive
+from src.controller.job_queue import (
+    JobQueue,
+    QueueFull,
+    ShuttingDown,
+    JOB_RETRY_AFTER_SECONDS,
+)
+from src.controller.motion_gate import scene_gates
+from src.controller.result_cache import result_cache
+from src.controller.frame_decoder import (
+    SUPPORTED_CONTENT_TYPES,
+    UnsupportedFrameType,
+    decode_frame,
+    ingest_frame,
+)
+from src.scripts.identify_cascade import cascade_stats as identify_cascade_stats
+from src.scripts.inference_scheduler import scheduler_stats
+from src.scripts.inference_workers import INFERENCE_WORKERS
+from src.scripts.label_parser import fast_path_stats
+from src.scripts.metrics import (
+    configure_logging,
+    metrics,
+    new_request_id,
+    request_context,
+    span,
+    stage_seconds,
+)
+from src.scripts.model_registry import registry, WARMUP_ENABLED
+from src.scripts.runtime_config import governor
+
+# Set by serve.py; empty lets Flask-SocketIO pick (eventlet, gevent or threading)
+SOCKETIO_ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE") or None
+# Under eventlet / gevent the job workers are greenlets, so a running analysis
+# would stall every connection; these servers only fan results out
+COOPERATIVE_SERVER = SOCKETIO_ASYNC_MODE in ("eventlet", "gevent")
+COOPERATIVE_SERVER_ERROR = (
+    f"This server runs SERVER_MODE={SOCKETIO_ASYNC_MODE} and does not analyze "
+    "frames; send them to a gthread server"
+)
+# e.g. redis://localhost:6379/0, so results_channel reaches clients of every server process
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE") or None
+# Seconds given to queued and running jobs to finish on shutdown
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "30"))
+# Largest request body; bigger uploads get a 413 before anything is read into memory
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "256"))
+# Reverse proxies / load balancers in front of the server that append to
+# X-Forwarded-For; 0 trusts none, since clients could forge the header
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
 
 app = Flask(__name__)
-socketio = SocketIO(app)
+app.config["MAX_CONTENT_LENGTH"] = int(MAX_UPLOAD_MB * 1024 * 1024)
+if TRUSTED_PROXIES:
+    # Without this every station behind the proxy has the proxy's address
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES, x_host=TRUSTED_PROXIES
+    )
+socketio = SocketIO(
+    app, async_mode=SOCKETIO_ASYNC_MODE, message_queue=SOCKETIO_MESSAGE_QUEUE
+)
+configure_logging()
+# Pin the process and size the TF/PyTorch/OpenCV thread pools before any of them load
+governor.configure()
+
+
+def load_pipeline():
+    """Import the analysis pipeline, which pulls in TensorFlow and registers the models."""
+    from src.controller.analyze_image import imageResults
+
+    return imageResults
+
+
+def load_batch_pipeline():
+    from src.controller.analyze_image import imageResultsBatch
+
+    return imageResultsBatch
+
+
+def load_items_pipeline():
+    from src.controller.analyze_image import imageResultsItems
+
+    return imageResultsItems
+
+
+def start_warmup():
+    """Load and warm every model in the background so Flask can serve immediately."""
+    if WARMUP_ENABLED:
+        registry.start_background_warmup(before_warmup=load_pipeline)
+
+
+def shutdown(timeout=SHUTDOWN_TIMEOUT_SECONDS):
+    """
+    Stop taking analysis jobs, let the accepted ones finish, then release
+    the model-serving processes and flush the capture archive.
+
+    Returns:
+        bool: True if every queued and running job completed in time.
+    """
+    drained = job_queue.shutdown(timeout)
+    pool = registry.peek("inference_workers")
+    if pool is not None:
+        pool.close()
+    if capture_archive is not None:
+        capture_archive.flush()
+    return drained
+
+
+# Bodies over MAX_UPLOAD_MB; answered as JSON like every other API error
+@app.errorhandler(413)
+def upload_too_large(error):
+    return jsonify({"error": f"Request body is larger than {MAX_UPLOAD_MB:g} MB"}), 413
+
+
+# Analysis routes are refused on cooperative servers; 503 lets the load
+# balancer retry on a gthread server
+@app.before_request
+def reject_analysis_on_cooperative_server():
+    if COOPERATIVE_SERVER and request.path.startswith("/analyze"):
+        return jsonify({"error": COOPERATIVE_SERVER_ERROR}), 503
 
 
 # Default route
@@ -33,35 +162,368 @@ def results():
 # Route to handle image analysis
 @app.route("/analyze", methods=["POST"])
 def analyze_image():
-    # Get the base64 image string from the request
-    image_data = request.form.get("image")
-    image = Image.open(BytesIO(base64.b64decode(image_data.split(",")[1])))
+    start = time.perf_counter()
+    request_id = new_request_id()
 
-    # Convert image to OpenCV format
-    opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    with request_context(request_id), span("decode"):
+        # Get the base64 image string from the request
+        image_data = request.form.get("image")
+        frame = ingest_frame(base64.b64decode(image_data.split(",")[1]))
 
-    # Save image to disk
-    cv2.imwrite("image.jpg", opencv_image)
+    return enqueue_analysis(frame, start, client_scope(), request_id)
 
-    image_array = np.array(image)
 
-    # Perform image analysis
-    print("Performing image analysis...")
-    # Get the results of the image analysis
-    results = imageResults(image_array)
-    print(type(results))
-    print(results)
+# Route to handle raw JPEG/WebP/PNG frames sent as the request body
+@app.route("/analyze/frame", methods=["POST"])
+def analyze_frame():
+    start = time.perf_counter()
+    request_id = new_request_id()
+
+    try:
+        with request_context(request_id), span("decode"):
+            frame = ingest_frame(request.get_data(), request.content_type)
+    except UnsupportedFrameType as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Accept-Post"] = ", ".join(SUPPORTED_CONTENT_TYPES)
+        return response, 415
+    except OSError:
+        return jsonify({"error": "Could not decode image"}), 400
+
+    return enqueue_analysis(frame, start, client_scope(), request_id)
+
+
+# Bulk analysis of many item photos (multipart files or a zip); one NDJSON
+# line is streamed back per image as soon as its result is ready
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+    request_id = new_request_id()
+    files = [upload for key in request.files for upload in request.files.getlist(key)]
+    body = b"" if files else request.get_data()
+
+    try:
+        uploads = list(iter_uploaded_images(files, body, request.content_type))
+    except BatchTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except zipfile.BadZipFile:
+        return jsonify({"error": "Could not read zip archive"}), 400
+    if not uploads:
+        return jsonify({"error": "No images in upload"}), 400
+
+    imageResultsBatch = load_batch_pipeline()
+
+    def generate():
+        errors = []
+        failed = 0
+        keyed = (((index, name), data) for index, (name, data) in enumerate(uploads))
+        with request_context(request_id):
+            results = imageResultsBatch(decode_uploads(keyed, errors))
+            for (index, name), result, error in results:
+                # Undecodable frames are reported as soon as the decoder skips them
+                for (error_index, error_name), message in errors:
+                    failed += 1
+                    yield batch_line(error_index, error_name, error=message)
+                errors.clear()
+                failed += error is not None
+                yield batch_line(index, name, result, error)
+            for (error_index, error_name), message in errors:
+                failed += 1
+                yield batch_line(error_index, error_name, error=message)
+        yield json.dumps({"done": True, "images": len(uploads), "failed": failed}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers["X-Request-Id"] = request_id
+    return response
+
+
+# Every item on a tray or conveyor in one frame (raw JPEG/WebP/PNG body);
+# answers with one result and bounding box per item
+@app.route("/analyze/items", methods=["POST"])
+def analyze_items():
+    request_id = new_request_id()
+
+    with request_context(request_id):
+        try:
+            with span("decode"):
+                image_array = decode_frame(request.get_data(), request.content_type)
+        except UnsupportedFrameType as e:
+            response = jsonify({"error": str(e)})
+            response.headers["Accept-Post"] = ", ".join(SUPPORTED_CONTENT_TYPES)
+            return response, 415
+        except OSError:
+            return jsonify({"error": "Could not decode image"}), 400
+
+        archive_frame(image_array)
+        with span("analysis_items"):
+            items = load_items_pipeline()(image_array)
+
+    # One row per item on the results page
+    for item in items:
+        socketio.emit("results_channel", {"objects": item, "job_id": request_id})
+    response = jsonify({"count": len(items), "items": items})
+    response.headers["X-Request-Id"] = request_id
+    return response
+
+
+def batch_line(index, filename, result=None, error=None):
+    line = {"index": index, "filename": filename}
+    if error is None:
+        line["result"] = result
+    else:
+        line["error"] = error
+    return json.dumps(line, default=str) + "\n"
+
+
+# Socket.IO binary frame upload; the return value is sent back as the ack
+@socketio.on("frame")
+def handle_frame(data, content_type=None, deadline_ms=None):
+    if COOPERATIVE_SERVER:
+        return {"error": COOPERATIVE_SERVER_ERROR}
+    start = time.perf_counter()
+    request_id = new_request_id()
+
+    try:
+        deadline = request_deadline(start, deadline_ms)
+        with request_context(request_id), span("decode"):
+            frame = ingest_frame(data, content_type)
+    except (UnsupportedFrameType, OSError, ValueError) as e:
+        return {"error": str(e)}
+
+    try:
+        job = job_queue.submit(
+            frame,
+            start,
+            request.sid,
+            job_id=request_id,
+            key=request.sid if ADMISSION_LATEST_FRAME_WINS else None,
+            deadline=deadline,
+        )
+    except QueueFull as e:
+        return {"error": str(e), "retry_after": JOB_RETRY_AFTER_SECONDS}
+
+    return {"status": "queued", "job_id": job.id}
+
+
+# Continuous stream mode: low-res frames are only used to decide when a new
+# item has settled in view; the ack tells the client to send a full frame
+@socketio.on("stream_frame")
+def handle_stream_frame(data, content_type=None):
+    try:
+        image_array = decode_frame(data, content_type)
+    except (UnsupportedFrameType, OSError) as e:
+        return {"error": str(e)}
+
+    return {"capture": scene_gates.update(request.sid, image_array)}
+
+
+# Sent when the belt or tray in view is empty, so that scene is never analyzed
+@socketio.on("stream_empty")
+def handle_stream_empty():
+    scene_gates.mark_empty(request.sid)
+    return {"status": "ok"}
 
-    # # For demo purposes, let's assume we detected "object"
-    # detected_objects = ["Object Detected"]
+
+@socketio.on("disconnect")
+def handle_disconnect():
+    scene_gates.remove(request.sid)
+
+
+# Route to poll the state and result of a queued analysis
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+def enqueue_analysis(frame, start, scope, request_id):
+    """Queue an ingested frame for analysis and answer with its job ID (or 429)."""
+    try:
+        deadline = request_deadline(start, request.headers.get("X-Deadline-Ms"))
+    except ValueError:
+        return jsonify({"error": "X-Deadline-Ms must be a number of milliseconds"}), 400
+
+    try:
+        # Latest frame wins: a newer frame from the same camera replaces one still waiting
+        job = job_queue.submit(
+            frame,
+            start,
+            scope,
+            job_id=request_id,
+            key=scope if ADMISSION_LATEST_FRAME_WINS else None,
+            deadline=deadline,
+        )
+    except QueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(JOB_RETRY_AFTER_SECONDS)
+        # 503 tells the load balancer to retry on another server process
+        return response, 503 if isinstance(e, ShuttingDown) else 429
+
+    # The job ID doubles as the request ID in logs
+    response = jsonify(
+        {"status": "queued", "job_id": job.id, "job_url": f"/jobs/{job.id}"}
+    )
+    response.headers["X-Request-Id"] = job.id
+    return response, 202
+
+
+def client_scope():
+    """
+    Cache and admission scope for an HTTP request: the camera ID if sent,
+    else the client address (the real one behind TRUSTED_PROXIES proxies).
+    """
+    return (
+        request.headers.get("X-Camera-Id")
+        or request.form.get("camera_id")
+        or request.remote_addr
+    )
+
+
+def run_analysis(job, frame, start, scope="default"):
+    """Run the analysis pipeline on an IngestedFrame and broadcast the results."""
+    stage_seconds.observe(job.started_at - job.created_at, stage="queue_wait")
+
+    # Optionally keep a sample of frames for debugging (written off the request path)
+    archive_frame(frame)
+
+    # Get the results of the image analysis
+    # Near-duplicate frames from the same camera reuse the previous result
+    # The deadline lets the pipeline skip OCR + LLM when they would overrun it
+    with request_context(job.id), deadline_context(job.deadline), span("analysis"):
+        results = result_cache.get_or_compute(frame, load_pipeline(), scope)
+    latency_seconds = time.perf_counter() - start
+    stage_seconds.observe(latency_seconds, stage="end_to_end")
+    registry.record_first_request(latency_seconds * 1000)
 
     # Send results to results page via WebSocket
-    # socketio.emit("results_channel", {"objects": detected_objects})
+    socketio.emit("results_channel", {"objects": results, "job_id": job.id})
+
+    return results
+
+
+# Worker pool that runs the pipeline off the request thread
+job_queue = JobQueue(run_analysis)
+
+metrics.gauge(
+    "job_queue_depth",
+    "Analysis jobs waiting for a worker.",
+    lambda: job_queue.stats()["queue_depth"],
+)
+metrics.gauge(
+    "models_ready", "1 once every model is warmed up.", lambda: int(registry.is_ready())
+)
+
+
+# Prometheus scrape endpoint: per-stage latency histograms and counters
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Route to inspect the inference batching queues
+@app.route("/stats/inference")
+def inference_stats():
+    return jsonify(scheduler_stats())
+
+
+# Route to inspect how often the identification cascade skipped its second model
+@app.route("/stats/cascade")
+def cascade_stats():
+    # Identification runs in the worker processes, or has not been imported yet;
+    # importing it here would load TensorFlow and register models after warmup
+    if INFERENCE_WORKERS or "src.scripts.identify_object" not in sys.modules:
+        return jsonify({"enabled": False})
+    return jsonify(identify_cascade_stats.stats())
+
+
+# Route to inspect the model-serving worker processes
+@app.route("/stats/workers")
+def worker_stats():
+    if not INFERENCE_WORKERS:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **registry.get("inference_workers").stats()})
+
+
+# Route to inspect how many labels the rule-based parser resolved without the LLM
+@app.route("/stats/labels")
+def label_stats():
+    return jsonify(fast_path_stats.stats())
+
+
+# Route to inspect the CPU profile and the thread pools each library actually uses
+@app.route("/stats/runtime")
+def runtime_stats():
+    return jsonify(governor.report())
+
+
+# Route to inspect frames superseded, expired or cut short under load
+@app.route("/stats/admission")
+def shed_stats():
+    stats = job_queue.stats()
+    return jsonify(
+        {
+            **admission_stats.stats(),
+            "superseded": stats["superseded"],
+            "expired": stats["expired"],
+            "rejected": stats["rejected"],
+        }
+    )
+
+
+# Route to inspect Textract calls, throttling and retries
+@app.route("/stats/textract")
+def textract_stats():
+    # Only once OCR has created the client; creating it here would open an AWS session
+    client = registry.peek("textract")
+    if client is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **client.stats()})
+
+
+# Route to inspect the analysis job queue
+@app.route("/stats/jobs")
+def job_stats():
+    return jsonify(job_queue.stats())
+
+
+# Route to inspect how many streamed frames the scene gate skipped
+@app.route("/stats/stream")
+def stream_stats():
+    return jsonify(scene_gates.stats())
+
+
+# Route to inspect the perceptual-hash result cache
+@app.route("/stats/cache")
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+
+# Route to inspect the debugging capture archive
+@app.route("/stats/capture")
+def capture_stats():
+    if capture_archive is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **capture_archive.stats()})
+
+
+# Liveness: the process is up and serving
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "uptime_seconds": registry.status()["uptime_seconds"]})
 
-    socketio.emit("results_channel", {"objects": results})
 
-    return jsonify({"status": "Image received and analyzed"})
+# Readiness: every model is loaded and warmed up, and the server is not draining
+@app.route("/readyz")
+def readyz():
+    status = registry.status()
+    status["draining"] = job_queue.stats()["closing"]
+    ready = status["ready"] and not status["draining"]
+    return jsonify(status), 200 if ready else 503
 
 
 if __name__ == "__main__":
+    # Development server; use serve.py in production
+    # Under the debug reloader only the child process serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warmup()
     socketio.run(app, debug=True, port=3100)
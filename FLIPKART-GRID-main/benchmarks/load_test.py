@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks.run_benchmarks import _jpeg, recorded_frames, synthetic_frames
+
+RESULTS_PATH = "benchmarks/results/load_test.json"
+
+
+def run_client(base_url, client_id, frames, requests_per_client, poll_interval):
+    """
+    One camera: post a frame to /analyze/frame, poll its job until it
+    finishes, then send the next. Returns per-request records.
+    """
+    session = requests.Session()
+    headers = {"Content-Type": "image/jpeg", "X-Camera-Id": f"load-test-{client_id}"}
+    records = []
+    for i in range(requests_per_client):
+        # Each client cycles through the frames from its own offset, so the
+        # result cache only sees repeats the way a real camera would
+        body = frames[(client_id + i) % len(frames)]
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/analyze/frame", data=body, headers=headers)
+        if response.status_code in (429, 503):
+            records.append({"status": "rejected", "code": response.status_code})
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        if response.status_code != 202:
+            records.append({"status": "error", "code": response.status_code})
+            continue
+
+        job_url = f"{base_url}{response.json()['job_url']}"
+        while True:
+            job = session.get(job_url).json()
+            if job["state"] in ("done", "failed", "superseded", "expired"):
+                break
+            time.sleep(poll_interval)
+        if job["state"] in ("superseded", "expired"):
+            # Shed by admission control before it ran
+            records.append({"status": "shed"})
+            continue
+        records.append(
+            {
+                "status": job["state"],
+                "latency_ms": (time.perf_counter() - start) * 1000,
+                "queue_ms": (job["started_at"] - job["created_at"]) * 1000,
+            }
+        )
+    return records
+
+
+def measure(base_url, frames, clients, requests_per_client, poll_interval):
+    """Latency percentiles and throughput with `clients` cameras sending at once."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        per_client = pool.map(
+            lambda client_id: run_client(
+                base_url, client_id, frames, requests_per_client, poll_interval
+            ),
+            range(clients),
+        )
+        records = [record for client in per_client for record in client]
+    wall_seconds = time.perf_counter() - start
+
+    completed = [r for r in records if r["status"] == "done"]
+    result = {
+        "requests": len(records),
+        "completed": len(completed),
+        "failed": sum(r["status"] == "failed" for r in records),
+        "rejected": sum(r["status"] == "rejected" for r in records),
+        "shed": sum(r["status"] == "shed" for r in records),
+        "errors": sum(r["status"] == "error" for r in records),
+        "throughput_per_s": len(completed) / wall_seconds,
+    }
+    if completed:
+        latencies = np.array([r["latency_ms"] for r in completed])
+        result.update(
+            {
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "mean_queue_ms": float(np.mean([r["queue_ms"] for r in completed])),
+            }
+        )
+    return result
+
+
+def wait_until_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/readyz").status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"{base_url} did not become ready in {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test a running server with concurrent camera clients."
+    )
+    parser.add_argument("--url", default="http://localhost:3100")
+    parser.add_argument("--frames", help="Directory of recorded frames (default: synthetic)")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=20, help="Frames per client")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--label", default="", help="Stored with the results, e.g. gthread")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    frames = recorded_frames(args.frames) if args.frames else synthetic_frames(count=32)
+    bodies = [_jpeg(frame) for frame in frames]
+    base_url = args.url.rstrip("/")
+    wait_until_ready(base_url, args.ready_timeout)
+
+    results = {"url": base_url, "label": args.label, "clients": {}}
+    for clients in args.clients:
+        result = measure(base_url, bodies, clients, args.requests, args.poll_interval)
+        results["clients"][str(clients)] = result
+        print(
+            f"{clients} client(s): {result['throughput_per_s']:.1f} frames/s, "
+            f"p50 {result.get('p50_ms', 0):.0f} ms, p95 {result.get('p95_ms', 0):.0f} ms, "
+            f"p99 {result.get('p99_ms', 0):.0f} ms, {result['rejected']} rejected, "
+            f"{result['shed']} shed"
+        )
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    # Start the server first (python serve.py), then:
+    #   python -m benchmarks.load_test --clients 1 8 32 --label gthread
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import base64
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.stubs import STUB_OCR_LINES, install_openai_stub, use_offline_services
+
+RESULTS_PATH = "benchmarks/results/latest.json"
+BASELINE_PATH = "benchmarks/baseline.json"
+STAGE_NAMES = [
+    "decode_data_url",
+    "decode_frame",
+    "ingest_frame",
+    "identify_object",
+    "predict_freshness",
+    "ocr_process_image",
+    "get_aws_ocr",
+    "get_product_details_from_text",
+    "image_results",
+]
+
+
+def synthetic_frames(count=8, size=(640, 480), seed=0):
+    """Camera-sized RGB frames: a shaded background with one coloured item on it."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width]
+    frames = []
+    for _ in range(count):
+        background = (x / width * 80 + y / height * 60 + 60)[..., None]
+        frame = np.repeat(background, 3, axis=2)
+        cx, cy = rng.uniform(0.3, 0.7) * width, rng.uniform(0.3, 0.7) * height
+        rx, ry = rng.uniform(0.1, 0.25) * width, rng.uniform(0.1, 0.25) * height
+        item = ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 <= 1
+        frame[item] = rng.uniform(40, 230, size=3)
+        frame += rng.normal(0, 6, frame.shape)
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def recorded_frames(image_dir, limit=32):
+    paths = sorted(
+        path
+        for pattern in ("*.jpg", "*.jpeg", "*.png", "*.webp")
+        for path in glob.glob(os.path.join(image_dir, pattern))
+    )[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No images found in {image_dir}")
+    return [np.array(Image.open(path).convert("RGB")) for path in paths]
+
+
+def _data_url(frame):
+    buffer = BytesIO()
+    Image.fromarray(frame).save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def _jpeg(frame):
+    buffer = BytesIO()
+    Image.fromarray(frame).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def build_stage(name):
+    """
+    Return (prepare, run) for a stage: `prepare(frame)` builds the stage
+    input once per frame outside the timed region, `run(input)` is timed.
+    The pipeline is imported here so the offline services are set up first.
+    """
+    if name == "decode_data_url":
+        from src.controller.frame_decoder import decode_data_url
+
+        return _data_url, decode_data_url
+    if name == "decode_frame":
+        from src.controller.frame_decoder import decode_frame
+
+        return _jpeg, lambda data: decode_frame(data, "image/jpeg")
+    if name == "ingest_frame":
+        from src.controller.frame_decoder import ingest_frame
+
+        return _jpeg, lambda data: ingest_frame(data, "image/jpeg")
+    if name == "identify_object":
+        from src.scripts.identify_object import identify_object
+
+        return None, identify_object
+    if name == "predict_freshness":
+        from src.scripts.freshness_detection import predict_freshness
+
+        return None, predict_freshness
+    if name == "ocr_process_image":
+        from src.scripts.ocr import process_image
+
+        return None, process_image
+    if name == "get_aws_ocr":
+        from src.scripts.ocr_aws import get_aws_ocr
+
+        return None, get_aws_ocr
+    if name == "get_product_details_from_text":
+        from src.scripts.ocr_details_openai import get_product_details_from_text
+
+        return lambda frame: " ".join(STUB_OCR_LINES), get_product_details_from_text
+    if name == "image_results":
+        from src.controller.analyze_image import imageResults
+
+        return None, imageResults
+    raise ValueError(f"Unknown stage {name!r}; use one of {STAGE_NAMES}")
+
+
+def peak_rss_mb():
+    """Process-wide high-water mark, so only per stage when each stage has its own process."""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def measure(run, inputs, iterations, concurrency):
+    """Latency percentiles and throughput of `iterations` calls at `concurrency`."""
+
+    def timed(i):
+        start = time.perf_counter()
+        run(inputs[i % len(inputs)])
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(timed, range(iterations))))
+    wall_seconds = time.perf_counter() - start
+
+    return {
+        "iterations": iterations,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "throughput_per_s": iterations / wall_seconds,
+    }
+
+
+def run_stage(name, frames, iterations, concurrency_levels, warmup=2):
+    # Interpreter, NumPy and the frames; whatever the stage adds comes on top
+    start_rss_mb = peak_rss_mb()
+    prepare, run = build_stage(name)
+    inputs = [prepare(frame) for frame in frames] if prepare else frames
+
+    # First calls load models and trace graphs; keep them out of the numbers
+    for i in range(warmup):
+        run(inputs[i % len(inputs)])
+
+    result = {"concurrency": {}}
+    for concurrency in concurrency_levels:
+        result["concurrency"][str(concurrency)] = measure(
+            run, inputs, iterations, concurrency
+        )
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["stage_rss_mb"] = result["peak_rss_mb"] - start_rss_mb
+    return result
+
+
+def run_stage_isolated(name, args):
+    """
+    Run one stage in a fresh process, so its peak RSS is not inflated by
+    the models and buffers of the stages measured before it.
+    """
+    command = [
+        sys.executable, "-m", "benchmarks.run_benchmarks", "--run-stage", name,
+        "--iterations", str(args.iterations),
+        "--concurrency", *map(str, args.concurrency),
+        "--textract-latency-ms", str(args.textract_latency_ms),
+        "--openai-latency-ms", str(args.openai_latency_ms),
+    ]
+    if args.frames:
+        command += ["--frames", args.frames]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        # e.g. the stage was OOM-killed
+        stderr = completed.stderr.strip().splitlines()
+        return {"error": stderr[-1] if stderr else f"exit code {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+def _run_stage_child(args):
+    """Child process of `run_stage_isolated`: print the stage result as one JSON line."""
+    use_offline_services(args.textract_latency_ms)
+    if args.run_stage in ("get_product_details_from_text", "image_results"):
+        install_openai_stub(args.openai_latency_ms)
+    frames = recorded_frames(args.frames) if args.frames else synthetic_frames()
+    try:
+        result = run_stage(args.run_stage, frames, args.iterations, args.concurrency)
+    except Exception as e:
+        # e.g. the local OCR weights are missing; report and keep going
+        result = {"error": str(e)}
+    print(json.dumps(result))
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    List regressions: p95 latency above, or throughput below, the baseline
+    by more than `tolerance` (a fraction) at any shared concurrency level.
+    """
+    regressions = []
+    for stage, result in results["stages"].items():
+        base_stage = baseline.get("stages", {}).get(stage)
+        if base_stage is None or "error" in result or "error" in base_stage:
+            continue
+        for level, current in result["concurrency"].items():
+            base = base_stage["concurrency"].get(level)
+            if base is None:
+                continue
+            if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{stage} @ {level}: p95 {base['p95_ms']:.1f} -> "
+                    f"{current['p95_ms']:.1f} ms"
+                )
+            if current["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+                regressions.append(
+                    f"{stage} @ {level}: throughput {base['throughput_per_s']:.1f} -> "
+                    f"{current['throughput_per_s']:.1f}/s"
+                )
+    return regressions
+
+
+def print_report(results):
+    for stage, result in results["stages"].items():
+        if "error" in result:
+            print(f"{stage}: skipped ({result['error']})")
+            continue
+        print(
+            f"{stage} (peak RSS {result['peak_rss_mb']:.0f} MB, "
+            f"{result['stage_rss_mb']:.0f} MB from the stage)"
+        )
+        for level, m in result["concurrency"].items():
+            print(
+                f"  x{level}: p50 {m['p50_ms']:.1f} ms, p95 {m['p95_ms']:.1f} ms, "
+                f"p99 {m['p99_ms']:.1f} ms, {m['throughput_per_s']:.1f}/s"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark each pipeline stage with Textract and OpenAI stubbed out."
+    )
+    parser.add_argument("--stages", nargs="+", default=STAGE_NAMES, choices=STAGE_NAMES)
+    parser.add_argument("--frames", help="Directory of recorded frames (default: synthetic)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--textract-latency-ms", type=float, default=150)
+    parser.add_argument("--openai-latency-ms", type=float, default=400)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store this run as the new baseline"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed regression (fraction)"
+    )
+    parser.add_argument("--run-stage", choices=STAGE_NAMES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        _run_stage_child(args)
+        return
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "frames": args.frames or "synthetic",
+        "textract_latency_ms": args.textract_latency_ms,
+        "openai_latency_ms": args.openai_latency_ms,
+        "stages": {},
+    }
+    for stage in args.stages:
+        print(f"Running {stage}...")
+        results["stages"][stage] = run_stage_isolated(stage, args)
+
+    print_report(results)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; rerun with --save-baseline to store one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.run_benchmarks --stages decode_frame identify_object
+    main()
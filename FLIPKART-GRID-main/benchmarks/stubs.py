@@ -0,0 +1,66 @@
+import os
+import time
+from types import SimpleNamespace
+
+# Label text the Textract stand-in returns for every frame
+STUB_OCR_LINES = [
+    "Sunille",
+    "Mondelez India Foods Private Limited",
+    "Net Wt 80 g",
+    "MRP Rs 100",
+    "01/02/22",
+    "29/10/22",
+]
+
+
+def use_offline_services(textract_latency_ms=0):
+    """
+    Point the pipeline at local stand-ins before any of it is imported.
+
+    Textract is replaced through TEXTRACT_BACKEND=stub, and a dummy OpenAI
+    key lets the OpenAI client be constructed; `install_openai_stub` then
+    swaps the client itself. The product details cache is disabled so every
+    call reaches the stand-in.
+    """
+    os.environ["TEXTRACT_BACKEND"] = "stub"
+    os.environ["TEXTRACT_STUB_LATENCY_MS"] = str(textract_latency_ms)
+    os.environ.setdefault("TEXTRACT_STUB_TEXT", "|".join(STUB_OCR_LINES))
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ["PRODUCT_DETAILS_CACHE"] = "0"
+
+
+class StubOpenAI:
+    """
+    Offline stand-in for the OpenAI client used by `ocr_details_openai`.
+
+    Answers `beta.chat.completions.parse` with a fixed ProductDetails after
+    `latency_ms`, so the LLM branch costs what a network round trip would.
+    """
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse))
+        )
+
+    def _parse(self, model, messages, response_format):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        parsed = response_format(
+            name="Sunille",
+            brand="Mondelez",
+            pack_size="80 g",
+            mfg_date="2022-02-01",
+            exp_date="2022-10-29",
+            mrp="100",
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))]
+        )
+
+
+def install_openai_stub(latency_ms=0):
+    """Swap the OpenAI client used by `get_product_details_from_text` for StubOpenAI."""
+    from src.scripts import ocr_details_openai
+
+    ocr_details_openai.client = StubOpenAI(latency_ms)
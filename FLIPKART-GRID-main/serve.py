@@ -0,0 +1,93 @@
+import importlib.util
+import os
+
+from gunicorn.app.base import BaseApplication
+
+# Production entry point: `python serve.py` instead of `python app.py`
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "3100"))
+# gthread: a thread per connection, analysis runs in real threads (default)
+# eventlet / gevent: cooperative, thousands of idle Socket.IO connections per
+# process, but no analysis (see COOPERATIVE_SERVER in app.py)
+SERVER_MODE = os.getenv("SERVER_MODE", "gthread")
+# Threads of a gthread server; every open WebSocket holds one
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "64"))
+# Simultaneous connections of an eventlet / gevent server
+SERVER_CONNECTIONS = int(os.getenv("SERVER_CONNECTIONS", "1000"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Seconds to finish in-flight requests and queued jobs after SIGTERM
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "30"))
+
+ASYNC_MODES = {"gthread": "threading", "eventlet": "eventlet", "gevent": "gevent"}
+
+
+def post_worker_init(worker):
+    """Start loading the models once the server process is up."""
+    from app import start_warmup
+
+    start_warmup()
+
+
+def worker_exit(server, worker):
+    """Drain the job queue and stop the model-serving processes."""
+    from app import shutdown
+
+    if shutdown(SHUTDOWN_TIMEOUT_SECONDS):
+        server.log.info("Job queue drained")
+    else:
+        server.log.warning("Shutdown timed out with jobs still queued or running")
+
+
+def server_options(mode=SERVER_MODE):
+    """
+    Gunicorn settings for one server process.
+
+    Flask-SocketIO keeps each client's session in the process that accepted
+    it, so a server always runs a single gunicorn worker. Scale out by
+    starting more servers (on other ports or hosts) behind a load balancer
+    with sticky sessions and a shared SOCKETIO_MESSAGE_QUEUE. Set
+    TRUSTED_PROXIES to the number of proxies in front, or have every
+    station send X-Camera-Id, so stations keep separate scopes.
+    """
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"SERVER_MODE must be one of {sorted(ASYNC_MODES)}")
+    # Fail here rather than when the worker boots
+    if mode != "gthread" and importlib.util.find_spec(mode) is None:
+        raise ImportError(
+            f"SERVER_MODE={mode} needs {mode}: pip install -r requirements-optional.txt"
+        )
+    return {
+        "bind": f"{SERVER_HOST}:{SERVER_PORT}",
+        "worker_class": mode,
+        "workers": 1,
+        "threads": SERVER_THREADS,
+        "worker_connections": SERVER_CONNECTIONS,
+        "backlog": SERVER_BACKLOG,
+        # Long-polling and WebSocket requests stay open; the models can take a while to load
+        "timeout": 0,
+        "graceful_timeout": SHUTDOWN_TIMEOUT_SECONDS + 5,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Must be set before app.py builds the SocketIO server
+        os.environ["SOCKETIO_ASYNC_MODE"] = ASYNC_MODES[self.options["worker_class"]]
+        from app import app
+
+        return app
+
+
+if __name__ == "__main__":
+    # SERVER_MODE=eventlet SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 python serve.py
+    ProductionServer(server_options()).run()
@@ -0,0 +1,142 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.scripts.metrics import metrics
+
+# Keep only the newest waiting frame per camera / client; older ones are superseded
+ADMISSION_LATEST_FRAME_WINS = os.getenv("ADMISSION_LATEST_FRAME_WINS", "1") != "0"
+# Default budget (ms) from a frame's arrival to its result; 0 means no deadline.
+# Clients can set their own with the X-Deadline-Ms header.
+ANALYSIS_DEADLINE_MS = float(os.getenv("ANALYSIS_DEADLINE_MS", "0"))
+# Assumed OCR + LLM time until real label lookups have been measured
+LABEL_COST_INITIAL_MS = float(os.getenv("LABEL_COST_INITIAL_MS", "1500"))
+# While lookups are being skipped, let one through this often so the estimate can recover
+LABEL_PROBE_INTERVAL_SECONDS = float(os.getenv("LABEL_PROBE_INTERVAL_SECONDS", "30"))
+
+# perf_counter() time by which the current request must finish, or None
+deadline_var = contextvars.ContextVar("deadline", default=None)
+
+shed_total = metrics.counter(
+    "admission_shed_total",
+    "Frames dropped or cut short by admission control, by reason.",
+    ["reason"],
+)
+
+
+def request_deadline(start, deadline_ms=None):
+    """
+    Absolute deadline (in perf_counter seconds) for a request that arrived at `start`.
+
+    Args:
+        start (float): perf_counter() at arrival.
+        deadline_ms (str or float): The client's budget, e.g. the X-Deadline-Ms
+            header; ANALYSIS_DEADLINE_MS when not given.
+
+    Raises:
+        ValueError: `deadline_ms` is not a number.
+    """
+    budget_ms = float(deadline_ms) if deadline_ms not in (None, "") else ANALYSIS_DEADLINE_MS
+    return start + budget_ms / 1000 if budget_ms > 0 else None
+
+
+@contextmanager
+def deadline_context(deadline):
+    """Make `deadline` visible to the pipeline stages run in this block."""
+    token = deadline_var.set(deadline)
+    try:
+        yield
+    finally:
+        deadline_var.reset(token)
+
+
+class LabelCost:
+    """
+    Moving average of how long an OCR + LLM label lookup takes.
+
+    The average only moves when a lookup runs, so once it exceeds the
+    budget every lookup would be skipped for good. `claim_probe` lets one
+    lookup through every `probe_interval` seconds to measure it again.
+    """
+
+    def __init__(
+        self,
+        initial_ms=LABEL_COST_INITIAL_MS,
+        weight=0.2,
+        probe_interval=LABEL_PROBE_INTERVAL_SECONDS,
+    ):
+        self.weight = weight
+        self.probe_interval = probe_interval
+        self._seconds = initial_ms / 1000
+        self._last_lookup = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._seconds += self.weight * (seconds - self._seconds)
+            self._last_lookup = time.monotonic()
+
+    def claim_probe(self):
+        """True for the first caller after `probe_interval` seconds without a lookup."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_lookup < self.probe_interval:
+                return False
+            # Later callers wait for the next interval while this probe runs
+            self._last_lookup = now
+            return True
+
+    def estimate(self):
+        with self._lock:
+            return self._seconds
+
+
+label_cost = LabelCost()
+
+
+class AdmissionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.labels_skipped = 0
+        self.label_probes = 0
+
+    def record_label_skip(self):
+        shed_total.inc(reason="label_skipped")
+        with self._lock:
+            self.labels_skipped += 1
+
+    def record_label_probe(self):
+        with self._lock:
+            self.label_probes += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "latest_frame_wins": ADMISSION_LATEST_FRAME_WINS,
+                "default_deadline_ms": ANALYSIS_DEADLINE_MS,
+                "labels_skipped": self.labels_skipped,
+                "label_probes": self.label_probes,
+                "label_cost_estimate_ms": label_cost.estimate() * 1000,
+            }
+
+
+admission_stats = AdmissionStats()
+
+
+def can_afford_labels():
+    """
+    Whether an OCR + LLM lookup started now is expected to finish before
+    the current request's deadline. Always True without a deadline, and
+    True for a periodic probe so a stale estimate cannot skip lookups forever.
+    """
+    deadline = deadline_var.get()
+    if deadline is None:
+        return True
+    if time.perf_counter() + label_cost.estimate() <= deadline:
+        return True
+    if label_cost.claim_probe():
+        admission_stats.record_label_probe()
+        return True
+    return False
@@ -1,72 +1,307 @@
-import socketio
-import jsonify
-import cv2
-import numpy as np
-from PIL import Image
-from src.scripts.identify_object import identify_object
-from src.scripts.freshness_detection import predict_freshness
-
-# from src.scripts.ocr import process_image
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.controller.admission import admission_stats, can_afford_labels, label_cost
+from src.scripts.frame_ingest import ingest_array, to_rgb
+from src.scripts.inference_workers import INFERENCE_WORKERS
+
+if INFERENCE_WORKERS:
+    # The models live in separate worker processes; frames go over shared memory
+    from src.scripts.inference_workers import (
+        identify_object,
+        predict_image_class_batch,
+        predict_freshness,
+        predict_freshness_batch,
+    )
+else:
+    from src.scripts.identify_object import identify_object, predict_image_class_batch
+    from src.scripts.freshness_detection import (
+        predict_freshness,
+        predict_freshness_batch,
+    )
+
 from src.scripts.ocr_aws import get_aws_ocr
 from src.scripts.ocr_details_openai import get_product_details_from_text
+from src.scripts.metrics import metrics, span
+from src.scripts.region_proposals import crop_regions, propose_regions
+
+logger = logging.getLogger(__name__)
+
+analysis_results = metrics.counter(
+    "analysis_results_total",
+    "Analyzed frames by branch (produce freshness or FMCG label).",
+    ["branch"],
+)
+
+# "separate" runs the three original models, "multi_head" runs one shared backbone
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "separate")
+
+# "aws" sends FMCG frames to Textract, "local" runs the U-Net + EasyOCR engine
+OCR_ENGINE = os.getenv("OCR_ENGINE", "aws")
+
+# Bulk analysis: images per model batch and concurrent OCR + LLM calls
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "16"))
+BATCH_OCR_WORKERS = int(os.getenv("BATCH_OCR_WORKERS", "4"))
+
+if OCR_ENGINE == "local":
+    from src.scripts.ocr import process_image
+
+if INFERENCE_MODE == "multi_head":
+    # Registers the combined model so it is covered by the startup warmup
+    from src.scripts.multi_head_model import analyze_produce, analyze_produce_batch
+
 
+def produce_response(freshness_class, freshness_scale):
+    # if freshness_class.startswith("Fresh"):
+    #     # Remove "Fresh" from the class name (e.g., FreshApple -> Apple)
+    #     freshness_class = freshness_class[5:]
+    # else:
+    #     # Remove "Rotten" from the class name (e.g., RottenApple -> Apple)
+    #     freshness_class = freshness_class[6:]
 
-def imageResults(image_array):
-    # Convert the input image to a 3-channel RGB image if it's not already
-    cv2.imwrite("object.jpg", image_array)
-    if image_array.ndim == 2 or image_array.shape[2] == 4:  # if grayscale or RGBA
-        image_array = Image.fromarray(image_array).convert("RGB")
-        image_array = np.array(image_array)  # Convert back to NumPy array
+    return {
+        "name": freshness_class,
+        "brand": "NA",
+        "pack_size": "NA",
+        "mfg_date": "NA",
+        "exp_date": "NA",
+        "mrp": "NA",
+        "status": freshness_scale,
+    }
 
-    # Ensure the image is in the correct format
-    if image_array.dtype != np.uint8:
-        image_array = image_array.astype(np.uint8)
 
-    # Identify the object
-    predicted_class, confidence, in_list = identify_object(image_array)
+def skipped_label_response(predicted_class):
+    """Answer for an FMCG frame whose label lookup was skipped to meet its deadline."""
+    return {
+        "name": predicted_class,
+        "brand": "NA",
+        "pack_size": "NA",
+        "mfg_date": "NA",
+        "exp_date": "NA",
+        "mrp": "NA",
+        "status": "NA",
+        "skipped": "label lookup (deadline)",
+    }
 
-    print(f"Object: {predicted_class}, Confidence: {confidence}")
+
+def label_details(frame):
+    """OCR an FMCG label and parse the product details from its text."""
+    start = time.perf_counter()
+    try:
+        return _label_details(frame)
+    finally:
+        # Feeds the estimate used to decide whether a lookup fits a deadline
+        label_cost.observe(time.perf_counter() - start)
+
+
+def _label_details(frame):
+    with span("ocr"):
+        # The only stage that reads label text, so the only one given full resolution
+        if OCR_ENGINE == "local":
+            ocr_text = process_image(frame.full)
+        else:
+            ocr_text = get_aws_ocr(frame.full)
+    logger.debug("OCR Text: %s", ocr_text)
+    with span("product_details"):
+        return get_product_details_from_text(ocr_text)
+
+
+def imageResults(frame):
+    """
+    Analyze one frame.
+
+    Args:
+        frame (IngestedFrame or np.array): The frame; arrays are wrapped with
+            ingest_array. The models only see its 224x224 model input.
+    """
+    frame = ingest_array(frame)
+    model_input = frame.model_input
+
+    produce_result = None
+    if INFERENCE_MODE == "multi_head":
+        # Identification and freshness come from a single backbone pass
+        with span("multi_head"):
+            produce_result = analyze_produce(model_input)
+        predicted_class = produce_result.predicted_class
+        confidence = produce_result.confidence
+        in_list = produce_result.in_list
+    else:
+        # Identify the object
+        with span("identify"):
+            predicted_class, confidence, in_list = identify_object(model_input)
+
+    logger.debug("Object: %s, Confidence: %s", predicted_class, confidence)
 
     response = {}
 
     if in_list and confidence > 0.95:
 
         # Perform freshness detection
-        print("Object in the list")
-        (
-            freshness_class,
-            predicted_probability,
-            adjusted_probability,
-            freshness_scale,
-        ) = predict_freshness(image_array)
-
-        # if freshness_class.startswith("Fresh"):
-        #     # Remove "Fresh" from the class name (e.g., FreshApple -> Apple)
-        #     freshness_class = freshness_class[5:]
-        # else:
-        #     # Remove "Rotten" from the class name (e.g., RottenApple -> Apple)
-        #     freshness_class = freshness_class[6:]
-
-        response = {
-            "name": freshness_class,
-            "brand": "NA",
-            "pack_size": "NA",
-            "mfg_date": "NA",
-            "exp_date": "NA",
-            "mrp": "NA",
-            "status": freshness_scale,
-        }
+        analysis_results.inc(branch="produce")
+        if produce_result is not None:
+            freshness_class = produce_result.freshness_class
+            freshness_scale = produce_result.freshness_scale
+        else:
+            with span("freshness"):
+                (
+                    freshness_class,
+                    predicted_probability,
+                    adjusted_probability,
+                    freshness_scale,
+                ) = predict_freshness(model_input)
+
+        response = produce_response(freshness_class, freshness_scale)
+
+    elif not can_afford_labels():
+        # OCR + LLM would overrun this request's deadline; answer with the class only
+        analysis_results.inc(branch="fmcg")
+        admission_stats.record_label_skip()
+        response = skipped_label_response(predicted_class)
 
     else:
         # Perform OCR if the object is not in the list
-        print("Object not in the list")
-        # ocr_text = process_image(image_array)
-        ocr_text = get_aws_ocr(image_array)
-        print(f"OCR Text: {ocr_text}")
-        product_details = get_product_details_from_text(ocr_text)
-        print(f"Product Details: {product_details}")
-        response = product_details
-
-    print("Sending response")
-    print(response)
+        analysis_results.inc(branch="fmcg")
+        response = label_details(frame)
+
+    logger.debug("Response: %s", response)
     return response
+
+
+def _identify_chunk(images):
+    """(class, confidence, in_list, produce_result) per image of a chunk."""
+    if INFERENCE_MODE == "multi_head":
+        with span("multi_head"):
+            # The whole chunk goes to the scheduler at once so it is batched
+            return [
+                (result.predicted_class, result.confidence, result.in_list, result)
+                for result in analyze_produce_batch(images)
+            ]
+
+    with span("identify"):
+        return [
+            (*prediction, None) for prediction in predict_image_class_batch(images)
+        ]
+
+
+def imageResultsBatch(items, chunk_size=BATCH_CHUNK_SIZE, ocr_workers=BATCH_OCR_WORKERS):
+    """
+    Analyze many images, yielding results as soon as each one is ready.
+
+    Images are identified `chunk_size` at a time with the batch APIs and
+    produce crops get their freshness in one batch. FMCG labels go to a pool
+    of `ocr_workers` threads, which caps concurrent Textract/OCR + OpenAI
+    calls while the next chunk is already being identified.
+
+    Args:
+        items (iterable): (key, frame) pairs, each frame an IngestedFrame or
+            an RGB array; the key is passed back.
+
+    Yields:
+        tuple: (key, response, error), with exactly one of response/error set.
+    """
+    # OCR + LLM futures in flight, mapped to their keys
+    pending = {}
+
+    def finished(block):
+        done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="batch-ocr") as pool:
+        chunk = []
+        items = iter(items)
+        while True:
+            item = next(items, None)
+            if item is not None:
+                chunk.append((item[0], ingest_array(item[1])))
+                if len(chunk) < chunk_size:
+                    continue
+            if not chunk:
+                break
+
+            keys = [key for key, _ in chunk]
+            frames = [frame for _, frame in chunk]
+            chunk = []
+            try:
+                predictions = _identify_chunk([frame.model_input for frame in frames])
+            except Exception as e:
+                for key in keys:
+                    yield key, None, str(e)
+                continue
+
+            produce = []
+            for key, frame, (_, confidence, in_list, produce_result) in zip(
+                keys, frames, predictions
+            ):
+                if in_list and confidence > 0.95:
+                    analysis_results.inc(branch="produce")
+                    produce.append((key, frame.model_input, produce_result))
+                else:
+                    analysis_results.inc(branch="fmcg")
+                    # Copy the context so OCR spans keep the request ID
+                    context = contextvars.copy_context()
+                    pending[pool.submit(context.run, label_details, frame)] = key
+
+            if produce and produce[0][2] is None:
+                try:
+                    with span("freshness"):
+                        freshness = predict_freshness_batch([p[1] for p in produce])
+                except Exception as e:
+                    for key, _, _ in produce:
+                        yield key, None, str(e)
+                    freshness = []
+                for (key, _, _), (freshness_class, _, _, scale) in zip(produce, freshness):
+                    yield key, produce_response(freshness_class, scale), None
+            else:
+                for key, _, produce_result in produce:
+                    yield key, produce_response(
+                        produce_result.freshness_class, produce_result.freshness_scale
+                    ), None
+
+            # Stream whatever OCR work finished while this chunk ran
+            if pending:
+                yield from finished(block=False)
+            if item is None:
+                break
+
+        while pending:
+            yield from finished(block=True)
+
+
+def imageResultsItems(image_array):
+    """
+    Analyze every item in a frame of a tray or conveyor.
+
+    Region proposals split the frame into one crop per item. The crops are
+    identified and graded as a single batch, and only crops classified as
+    FMCG go through OCR and the LLM.
+
+    Returns:
+        list: One dict per item with its "box" ({x, y, width, height} in
+        frame pixels) plus either the usual response fields or an "error".
+    """
+    # Proposals need the whole frame at full resolution; each crop is a view of it
+    image_array = to_rgb(image_array)
+    with span("region_proposals"):
+        boxes = propose_regions(image_array)
+    crops = crop_regions(image_array, boxes)
+
+    items = [None] * len(boxes)
+    for index, response, error in imageResultsBatch(
+        enumerate(crops), chunk_size=len(crops)
+    ):
+        x, y, width, height = boxes[index]
+        item = {"box": {"x": x, "y": y, "width": width, "height": height}}
+        if error is None:
+            item.update(response)
+        else:
+            item["error"] = error
+        items[index] = item
+    return items
@@ -0,0 +1,104 @@
+import os
+import zipfile
+from io import BytesIO
+
+from src.controller.frame_decoder import UnsupportedFrameType, ingest_frame
+
+# Largest number of images accepted in one /analyze/batch request
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "500"))
+# Largest single image, after unzipping
+BATCH_MAX_IMAGE_MB = float(os.getenv("BATCH_MAX_IMAGE_MB", "25"))
+# Largest total of all images in one request, after unzipping
+BATCH_MAX_TOTAL_MB = float(os.getenv("BATCH_MAX_TOTAL_MB", "512"))
+# Entries (of any kind) a zip may list
+BATCH_MAX_ZIP_ENTRIES = int(os.getenv("BATCH_MAX_ZIP_ENTRIES", "2000"))
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class BatchTooLarge(ValueError):
+    """Raised when an upload holds too many images or too many bytes."""
+
+
+def _is_zip(filename, content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return content_type in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+
+def _zip_members(data):
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        entries = archive.infolist()
+        if len(entries) > BATCH_MAX_ZIP_ENTRIES:
+            raise BatchTooLarge(f"At most {BATCH_MAX_ZIP_ENTRIES} entries per zip")
+        for info in entries:
+            name = info.filename
+            # Skip folders and macOS resource forks
+            if info.is_dir() or os.path.basename(name).startswith("._"):
+                continue
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                # Checked before inflating; zipfile never reads past the declared size
+                _check_image_size(name, info.file_size)
+                yield name, archive.read(info)
+
+
+def _check_image_size(name, size):
+    if size > BATCH_MAX_IMAGE_MB * 1024 * 1024:
+        raise BatchTooLarge(f"{name} is larger than {BATCH_MAX_IMAGE_MB:g} MB")
+
+
+def iter_uploaded_images(files, body=b"", content_type=None):
+    """
+    Yield (filename, encoded bytes) for every image in a bulk upload.
+
+    Args:
+        files (list): werkzeug FileStorage objects from a multipart upload;
+            any of them may itself be a zip of images.
+        body (bytes): The raw request body, used when it is a zip archive.
+        content_type (str): The request Content-Type.
+
+    Raises:
+        BatchTooLarge: More than BATCH_MAX_IMAGES images, an image over
+            BATCH_MAX_IMAGE_MB or more than BATCH_MAX_TOTAL_MB in total
+            (after unzipping) were sent.
+    """
+    count = 0
+    total_bytes = 0
+
+    def counted(name, data):
+        nonlocal count, total_bytes
+        count += 1
+        total_bytes += len(data)
+        if count > BATCH_MAX_IMAGES:
+            raise BatchTooLarge(f"At most {BATCH_MAX_IMAGES} images per batch")
+        if total_bytes > BATCH_MAX_TOTAL_MB * 1024 * 1024:
+            raise BatchTooLarge(f"At most {BATCH_MAX_TOTAL_MB:g} MB of images per batch")
+        return name, data
+
+    if not files and _is_zip(None, content_type):
+        for name, data in _zip_members(body):
+            yield counted(name, data)
+        return
+
+    for upload in files:
+        data = upload.read()
+        if _is_zip(upload.filename, upload.mimetype):
+            for name, member in _zip_members(data):
+                yield counted(f"{upload.filename}/{name}", member)
+        else:
+            _check_image_size(upload.filename, len(data))
+            yield counted(upload.filename, data)
+
+
+def decode_uploads(uploads, errors):
+    """
+    Decode (filename, bytes) pairs, yielding (filename, IngestedFrame).
+
+    Frames that cannot be decoded are appended to `errors` as
+    (filename, message) instead of stopping the batch.
+    """
+    for name, data in uploads:
+        try:
+            yield name, ingest_frame(data)
+        except (UnsupportedFrameType, OSError) as e:
+            errors.append((name, str(e)))
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from io import BytesIO
+from queue import Queue, Full
+
+from PIL import Image
+
+from src.scripts.frame_ingest import IngestedFrame
+
+# The archive is off unless CAPTURE_ARCHIVE_DIR is set
+CAPTURE_ARCHIVE_DIR = os.getenv("CAPTURE_ARCHIVE_DIR")
+CAPTURE_EVERY_N = int(os.getenv("CAPTURE_EVERY_N", "10"))
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "16"))
+CAPTURE_MAX_FILES = int(os.getenv("CAPTURE_MAX_FILES", "500"))
+CAPTURE_MAX_AGE_HOURS = float(os.getenv("CAPTURE_MAX_AGE_HOURS", "24"))
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureArchive:
+    """
+    Writes a sample of analyzed frames to disk for debugging.
+
+    Frames are handed to a bounded queue and encoded and written by a
+    background thread, so the request path never waits on disk. When the
+    queue is full the frame is dropped. Old captures are pruned by count
+    and by age.
+    """
+
+    def __init__(
+        self,
+        directory,
+        every_n=CAPTURE_EVERY_N,
+        queue_size=CAPTURE_QUEUE_SIZE,
+        max_files=CAPTURE_MAX_FILES,
+        max_age_hours=CAPTURE_MAX_AGE_HOURS,
+    ):
+        self.directory = directory
+        self.every_n = max(1, every_n)
+        self.max_files = max_files
+        self.max_age_seconds = max_age_hours * 3600
+
+        os.makedirs(directory, exist_ok=True)
+        self._queue = Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._written = 0
+        self._dropped = 0
+        self._pruned = 0
+
+        self._worker = threading.Thread(
+            target=self._run, name="capture-archive", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, image_array, tag="frame"):
+        """Queue every Nth frame for archiving without blocking. Returns True if queued."""
+        with self._lock:
+            self._seen += 1
+            if self._seen % self.every_n:
+                return False
+        try:
+            self._queue.put_nowait((time.time_ns(), tag, image_array))
+            return True
+        except Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            timestamp, tag, image_array = self._queue.get()
+            try:
+                # Ingested frames are decoded to full resolution here, off the request path
+                if isinstance(image_array, IngestedFrame):
+                    image_array = image_array.full
+                buffer = BytesIO()
+                Image.fromarray(image_array).convert("RGB").save(buffer, format="JPEG")
+                path = os.path.join(self.directory, f"{timestamp}_{tag}.jpg")
+                with open(path, "wb") as file:
+                    file.write(buffer.getvalue())
+                with self._lock:
+                    self._written += 1
+                self._enforce_retention()
+            except Exception:
+                logger.exception("Capture archive write failed")
+            finally:
+                self._queue.task_done()
+
+    def _enforce_retention(self):
+        # File names start with a nanosecond timestamp, so name order is age order
+        captures = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")),
+            key=lambda entry: entry.name,
+        )
+        cutoff = time.time() - self.max_age_seconds
+        excess = len(captures) - self.max_files
+        for i, entry in enumerate(captures):
+            if i < excess or entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    with self._lock:
+                        self._pruned += 1
+                except FileNotFoundError:
+                    pass
+
+    def flush(self, timeout=5):
+        """
+        Wait up to `timeout` seconds for queued frames to be written,
+        including the one being written now. Returns True if all were.
+        """
+        deadline = time.monotonic() + timeout
+        # Queue.join() with a timeout: unfinished_tasks only drops in task_done()
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "queue_depth": self._queue.qsize(),
+                "frames_seen": self._seen,
+                "written": self._written,
+                "dropped": self._dropped,
+                "pruned": self._pruned,
+            }
+
+
+capture_archive = CaptureArchive(CAPTURE_ARCHIVE_DIR) if CAPTURE_ARCHIVE_DIR else None
+
+
+def archive_frame(image_array, tag="frame"):
+    """Hand a frame (RGB array or IngestedFrame) to the capture archive if it is enabled."""
+    if capture_archive is not None:
+        capture_archive.submit(image_array, tag)
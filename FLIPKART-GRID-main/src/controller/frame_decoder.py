@@ -0,0 +1,117 @@
+import base64
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from src.scripts.frame_ingest import ingest_bytes
+
+# Content types accepted by the binary ingestion path
+SUPPORTED_CONTENT_TYPES = ("image/jpeg", "image/webp", "image/png")
+
+# Leading bytes used to sniff the format when the client sends octet-stream
+_MAGIC_BYTES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG": "image/png",
+}
+
+
+class UnsupportedFrameType(ValueError):
+    """Raised when a frame is sent with a content type we cannot decode."""
+
+
+def negotiate_content_type(content_type, data=b""):
+    """
+    Resolve the content type of an uploaded frame.
+
+    Args:
+        content_type (str): The Content-Type header (parameters are ignored).
+        data (bytes): The frame bytes, used to sniff `application/octet-stream`.
+
+    Returns:
+        str: One of SUPPORTED_CONTENT_TYPES.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in SUPPORTED_CONTENT_TYPES:
+        return content_type
+
+    if content_type in ("", "application/octet-stream"):
+        for magic, sniffed in _MAGIC_BYTES.items():
+            if data.startswith(magic):
+                return sniffed
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "image/webp"
+
+    raise UnsupportedFrameType(
+        f"Unsupported frame type {content_type!r}; "
+        f"send one of {', '.join(SUPPORTED_CONTENT_TYPES)}"
+    )
+
+
+def decode_frame(data, content_type=None):
+    """
+    Decode raw JPEG/WebP/PNG bytes into an RGB uint8 NumPy array.
+
+    Args:
+        data (bytes): The encoded frame.
+        content_type (str): The Content-Type the client sent, if any.
+
+    Returns:
+        np.array: The decoded frame in RGB order.
+    """
+    negotiate_content_type(content_type, data)
+    image = Image.open(BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def ingest_frame(data, content_type=None):
+    """
+    Decode raw JPEG/WebP/PNG bytes once into an IngestedFrame for analysis.
+
+    Unlike decode_frame, JPEGs are decoded at reduced scale for the models
+    and only decoded at full resolution if OCR asks for it.
+    """
+    negotiate_content_type(content_type, data)
+    return ingest_bytes(data)
+
+
+def decode_data_url(data_url):
+    """Decode the legacy `data:image/png;base64,...` form field."""
+    return decode_frame(base64.b64decode(data_url.split(",")[1]))
+
+
+if __name__ == "__main__":
+    # Compare the legacy base64 PNG upload with a binary JPEG upload:
+    #   python -m src.controller.frame_decoder path/to/frame.png
+    frame = np.array(Image.open(sys.argv[1]).convert("RGB"))
+
+    png = BytesIO()
+    Image.fromarray(frame).save(png, format="PNG")
+    data_url = "data:image/png;base64," + base64.b64encode(png.getvalue()).decode()
+
+    jpeg = BytesIO()
+    Image.fromarray(frame).save(jpeg, format="JPEG", quality=85)
+    jpeg_bytes = jpeg.getvalue()
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode_data_url(data_url)
+    legacy_ms = (time.perf_counter() - start) * 1000 / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode_frame(jpeg_bytes, "image/jpeg")
+    binary_ms = (time.perf_counter() - start) * 1000 / runs
+
+    print(f"Frame: {frame.shape[1]}x{frame.shape[0]}")
+    print(f"Base64 PNG upload: {len(data_url)} bytes, decode {legacy_ms:.1f} ms")
+    print(f"Binary JPEG upload: {len(jpeg_bytes)} bytes, decode {binary_ms:.1f} ms")
+    print(
+        f"Saved per frame: {len(data_url) - len(jpeg_bytes)} bytes, "
+        f"{legacy_ms - binary_ms:.1f} ms"
+    )
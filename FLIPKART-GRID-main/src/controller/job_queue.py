@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from queue import Queue, Full
+
+from src.controller.admission import shed_total
+from src.scripts.metrics import request_context
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "300"))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+class ShuttingDown(QueueFull):
+    """Raised when a job is submitted after shutdown() has started."""
+
+
+class Job:
+    def __init__(self, job_id=None, deadline=None):
+        self.id = job_id or uuid.uuid4().hex
+        # perf_counter() time after which the job is not worth starting
+        self.deadline = deadline
+        self.state = "queued"
+        self.superseded_by = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "result": self.result,
+            "error": self.error,
+            "superseded_by": self.superseded_by,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of analysis jobs drained by a pool of worker threads.
+
+    `submit` never blocks: it either queues the job and returns it, or
+    raises QueueFull so the caller can answer 429. Finished jobs are kept
+    for `retention_seconds` so clients can poll them.
+
+    Jobs submitted with a `key` (a camera or client) follow latest-frame-
+    wins: while a job for that key is still waiting, a newer one takes
+    its place in line and the older one ends as "superseded". Jobs whose
+    deadline passed while they waited end as "expired" without running.
+    """
+
+    def __init__(
+        self,
+        handler,
+        workers=JOB_WORKERS,
+        max_depth=JOB_QUEUE_SIZE,
+        retention_seconds=JOB_RETENTION_SECONDS,
+    ):
+        self.handler = handler
+        self.retention_seconds = retention_seconds
+        self._queue = Queue(maxsize=max_depth)
+        self._jobs = {}
+        # key -> [job, args, key] queue entry that has not started yet
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._running = 0
+        self._superseded = 0
+        self._expired = 0
+        self._closing = False
+
+        self.workers = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, *args, job_id=None, key=None, deadline=None):
+        """
+        Queue `handler(*args)` and return the Job, or raise QueueFull.
+
+        Args:
+            key: Latest-frame-wins scope; None queues the job unconditionally.
+            deadline (float): perf_counter() time after which it is not started.
+        """
+        if self._closing:
+            raise ShuttingDown("Server is shutting down")
+        self._prune()
+        job = Job(job_id, deadline)
+        with self._lock:
+            self._jobs[job.id] = job
+            entry = self._pending.get(key) if key is not None else None
+            if entry is not None:
+                # Reuse the waiting job's place in line for the newer frame
+                stale = entry[0]
+                stale.state = "superseded"
+                stale.superseded_by = job.id
+                stale.finished_at = time.time()
+                entry[0], entry[1] = job, args
+                self._superseded += 1
+                shed_total.inc(reason="superseded")
+                return job
+
+            entry = [job, args, key]
+            try:
+                self._queue.put_nowait(entry)
+            except Full:
+                del self._jobs[job.id]
+                self._rejected += 1
+                raise QueueFull(f"{self._queue.maxsize} jobs already queued")
+            if key is not None:
+                self._pending[key] = entry
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            with self._lock:
+                job, args, key = entry
+                if key is not None and self._pending.get(key) is entry:
+                    del self._pending[key]
+                expired = job.deadline is not None and time.perf_counter() > job.deadline
+                if expired:
+                    self._expired += 1
+                else:
+                    self._running += 1
+
+            if expired:
+                job.state = "expired"
+                job.error = "Deadline passed before the analysis started"
+                job.finished_at = time.time()
+                shed_total.inc(reason="expired")
+                self._queue.task_done()
+                continue
+
+            job.state = "running"
+            job.started_at = time.time()
+            try:
+                job.result = self.handler(job, *args)
+                job.state = "done"
+                with self._lock:
+                    self._completed += 1
+            except Exception as e:
+                job.error = str(e)
+                job.state = "failed"
+                with self._lock:
+                    self._failed += 1
+                # The job ID is the request ID of the upload that created it
+                with request_context(job.id):
+                    logger.exception("Job %s failed", job.id)
+            finally:
+                job.finished_at = time.time()
+                with self._lock:
+                    self._running -= 1
+                self._queue.task_done()
+
+    def shutdown(self, timeout=30):
+        """
+        Stop accepting jobs and wait up to `timeout` seconds for the queued
+        and running ones to finish. Returns True if everything drained.
+        """
+        self._closing = True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # Counts each job from submit() until task_done(), including ones just dequeued
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self.workers),
+                "queue_depth": self._queue.qsize(),
+                "max_depth": self._queue.maxsize,
+                "tracked_jobs": len(self._jobs),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "superseded": self._superseded,
+                "expired": self._expired,
+                "running": self._running,
+                "closing": self._closing,
+            }
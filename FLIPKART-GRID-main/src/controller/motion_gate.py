@@ -0,0 +1,190 @@
+import functools
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+# Mean absolute difference (0-255) between consecutive frames below which the scene is still
+STREAM_MOTION_THRESHOLD = float(os.getenv("STREAM_MOTION_THRESHOLD", "4"))
+# Consecutive still frames needed before the scene counts as settled
+STREAM_SETTLE_FRAMES = int(os.getenv("STREAM_SETTLE_FRAMES", "3"))
+# Difference from the last analyzed scene needed to treat it as a new item
+STREAM_CHANGE_THRESHOLD = float(os.getenv("STREAM_CHANGE_THRESHOLD", "12"))
+STREAM_HISTOGRAM_THRESHOLD = float(os.getenv("STREAM_HISTOGRAM_THRESHOLD", "0.25"))
+# The empty belt / tray, never analyzed: "off" (only what the client marks with
+# stream_empty), "first" (the first settled scene of a stream), or the path of
+# an image of the empty scene
+STREAM_BACKGROUND = os.getenv("STREAM_BACKGROUND", "off")
+
+# Every frame is compared at this size, whatever the client sends
+GATE_SIZE = (64, 48)
+
+
+def _thumbnail(image_array):
+    image = Image.fromarray(image_array).convert("L").resize(GATE_SIZE, Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32)
+
+
+def _histogram(thumbnail):
+    histogram, _ = np.histogram(thumbnail, bins=32, range=(0, 256))
+    return histogram / histogram.sum()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_background(spec):
+    """Thumbnail of the configured background image, or None for "first" / "off"."""
+    if spec in ("first", "off", ""):
+        return None
+    return _thumbnail(np.asarray(Image.open(spec).convert("RGB")))
+
+
+class SceneGate:
+    """
+    Decides, from a stream of low-resolution frames, when a new item has
+    settled in front of the camera.
+
+    A frame is "still" when it barely differs from the previous one. Once
+    `settle_frames` still frames arrive in a row, the settled scene is
+    compared with the last scene that was analyzed; if either the pixel
+    difference or the grayscale histogram moved enough, `update` returns
+    True exactly once for that scene.
+
+    Settled scenes that match the background (the empty belt or tray) are
+    never analyzed; they only become the new reference, so an item placed
+    after the belt was cleared counts as new even if it matches the last one.
+    With background="off" nothing is treated as background until the client
+    calls `mark_empty`, so an item already in view at the start is analyzed.
+    """
+
+    def __init__(
+        self,
+        motion_threshold=STREAM_MOTION_THRESHOLD,
+        settle_frames=STREAM_SETTLE_FRAMES,
+        change_threshold=STREAM_CHANGE_THRESHOLD,
+        histogram_threshold=STREAM_HISTOGRAM_THRESHOLD,
+        background=STREAM_BACKGROUND,
+    ):
+        self.motion_threshold = motion_threshold
+        self.settle_frames = settle_frames
+        self.change_threshold = change_threshold
+        self.histogram_threshold = histogram_threshold
+
+        self._previous = None
+        self._still_frames = 0
+        self._reference = None
+        self._reference_histogram = None
+        self._learn_background = background == "first"
+        self._background = _load_background(background)
+        self._background_histogram = (
+            _histogram(self._background) if self._background is not None else None
+        )
+        self.frames = 0
+        self.triggers = 0
+        self.background_frames = 0
+
+    def _matches(self, current, histogram, reference, reference_histogram):
+        change = np.abs(current - reference).mean()
+        histogram_delta = np.abs(histogram - reference_histogram).sum() / 2
+        return change < self.change_threshold and histogram_delta < self.histogram_threshold
+
+    def update(self, image_array):
+        """Feed one low-res RGB frame; returns True when it should be analyzed."""
+        self.frames += 1
+        current = _thumbnail(image_array)
+        previous, self._previous = self._previous, current
+        if previous is None:
+            return False
+
+        motion = np.abs(current - previous).mean()
+        if motion > self.motion_threshold:
+            self._still_frames = 0
+            return False
+
+        self._still_frames += 1
+        if self._still_frames != self.settle_frames:
+            return False
+
+        histogram = _histogram(current)
+        if self._learn_background:
+            self._learn_background = False
+            self._background, self._background_histogram = current, histogram
+        if self._background is not None and self._matches(
+            current, histogram, self._background, self._background_histogram
+        ):
+            self.background_frames += 1
+            self._reference = current
+            self._reference_histogram = histogram
+            return False
+        if self._reference is not None and self._matches(
+            current, histogram, self._reference, self._reference_histogram
+        ):
+            return False
+
+        self._reference = current
+        self._reference_histogram = histogram
+        self.triggers += 1
+        return True
+
+    def mark_empty(self):
+        """
+        Take the scene in view as the background: at once if it has already
+        settled, otherwise when it next settles.
+        """
+        if self._previous is not None and self._still_frames >= self.settle_frames:
+            self._learn_background = False
+            self._background = self._reference = self._previous
+            self._background_histogram = self._reference_histogram = _histogram(
+                self._previous
+            )
+        else:
+            self._learn_background = True
+
+
+class SceneGates:
+    """One SceneGate per streaming client."""
+
+    def __init__(self):
+        self._gates = {}
+        self._lock = threading.Lock()
+        self._closed_frames = 0
+        self._closed_triggers = 0
+        self._closed_background = 0
+
+    def update(self, client_id, image_array):
+        with self._lock:
+            gate = self._gates.setdefault(client_id, SceneGate())
+        return gate.update(image_array)
+
+    def mark_empty(self, client_id):
+        with self._lock:
+            gate = self._gates.setdefault(client_id, SceneGate())
+        gate.mark_empty()
+
+    def remove(self, client_id):
+        with self._lock:
+            gate = self._gates.pop(client_id, None)
+            if gate is not None:
+                self._closed_frames += gate.frames
+                self._closed_triggers += gate.triggers
+                self._closed_background += gate.background_frames
+
+    def stats(self):
+        with self._lock:
+            frames = self._closed_frames + sum(g.frames for g in self._gates.values())
+            triggers = self._closed_triggers + sum(
+                g.triggers for g in self._gates.values()
+            )
+            background = self._closed_background + sum(
+                g.background_frames for g in self._gates.values()
+            )
+            return {
+                "streams": len(self._gates),
+                "frames": frames,
+                "analyzed": triggers,
+                "background_scenes": background,
+                "skipped_ratio": 1 - triggers / frames if frames else 0.0,
+            }
+
+
+scene_gates = SceneGates()
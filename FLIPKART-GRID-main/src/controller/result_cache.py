@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# Set RESULT_CACHE=0 to send every frame through the full pipeline
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE", "1") != "0"
+RESULT_CACHE_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "4"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "30"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "64"))
+RESULT_CACHE_MAX_SCOPES = int(os.getenv("RESULT_CACHE_MAX_SCOPES", "256"))
+
+
+def dhash(image_array, hash_size=8):
+    """
+    Compute the difference hash of a frame as a `hash_size * hash_size` bit int.
+
+    The frame is shrunk to (hash_size + 1) x hash_size grayscale and each bit
+    records whether a pixel is brighter than its right-hand neighbour, so
+    small shifts, noise and exposure changes barely move the hash.
+    """
+    # Strided view first so PIL only ever touches a ~64px thumbnail
+    step = max(1, min(image_array.shape[:2]) // 64)
+    image = Image.fromarray(np.ascontiguousarray(image_array[::step, ::step]))
+    image = image.convert("L")
+    image = image.resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(image, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of `imageResults` outputs keyed by perceptual hash.
+
+    Entries are kept per scope (a session or camera) so one station never
+    gets another station's result. A lookup returns the most recently used
+    entry within `max_distance` bits of the frame's hash.
+    """
+
+    def __init__(
+        self,
+        max_distance=RESULT_CACHE_MAX_DISTANCE,
+        ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+        max_entries=RESULT_CACHE_MAX_ENTRIES,
+        max_scopes=RESULT_CACHE_MAX_SCOPES,
+    ):
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, frame_hash, scope="default"):
+        """Return the cached result for a near-duplicate frame, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is not None:
+                self._scopes.move_to_end(scope)
+                for key in reversed(list(entries)):
+                    result, stored_at = entries[key]
+                    if now - stored_at > self.ttl_seconds:
+                        del entries[key]
+                        self._expirations += 1
+                    elif hamming_distance(key, frame_hash) <= self.max_distance:
+                        entries.move_to_end(key)
+                        self._hits += 1
+                        return result
+            self._misses += 1
+            return None
+
+    def put(self, frame_hash, result, scope="default"):
+        with self._lock:
+            entries = self._scopes.setdefault(scope, OrderedDict())
+            self._scopes.move_to_end(scope)
+            entries[frame_hash] = (result, time.monotonic())
+            entries.move_to_end(frame_hash)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._evictions += 1
+            while len(self._scopes) > self.max_scopes:
+                _, dropped = self._scopes.popitem(last=False)
+                self._evictions += len(dropped)
+
+    def get_or_compute(self, frame, compute, scope="default"):
+        """
+        Return the cached result for an IngestedFrame or compute and cache it.
+
+        The hash is taken from the 224x224 model input, so a cache hit never
+        needs the full-resolution frame.
+        """
+        if not RESULT_CACHE_ENABLED:
+            return compute(frame)
+
+        frame_hash = dhash(frame.model_input)
+        result = self.get(frame_hash, scope)
+        if result is None:
+            result = compute(frame)
+            # Results cut short under load are not reused for the next frame
+            if "skipped" not in result:
+                self.put(frame_hash, result, scope)
+        return result
+
+    def clear(self, scope=None):
+        with self._lock:
+            if scope is None:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": RESULT_CACHE_ENABLED,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "scopes": len(self._scopes),
+                "entries": sum(len(entries) for entries in self._scopes.values()),
+            }
+
+
+# Shared by every request thread
+result_cache = ResultCache()
@@ -0,0 +1,169 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from PIL import Image
+
+from src.scripts.identify_object import (
+    BASE_MODEL_PATH,
+    FINE_TUNED_MODEL_PATH,
+    preprocess_image,
+)
+from src.scripts.freshness_detection import model_path as FRESHNESS_MODEL_PATH
+from src.scripts.inference_backend import exported_path, load_backend
+
+MODEL_PATHS = [FINE_TUNED_MODEL_PATH, BASE_MODEL_PATH, FRESHNESS_MODEL_PATH]
+REPORT_PATH = "src/models/conversion_report.json"
+
+
+def load_samples(image_dir, limit=100):
+    """Preprocessed (N, 224, 224, 3) samples from a directory of images."""
+    paths = sorted(
+        path
+        for pattern in ("*.jpg", "*.jpeg", "*.png", "*.webp")
+        for path in glob.glob(os.path.join(image_dir, pattern))
+    )[:limit]
+    if not paths:
+        raise FileNotFoundError(f"No images found in {image_dir}")
+    return np.concatenate(
+        [
+            preprocess_image(np.array(Image.open(path).convert("RGB")))
+            for path in paths
+        ]
+    ).astype(np.float32)
+
+
+def export_tflite(model, keras_path, samples, quantized):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantized:
+        # int8 weights and activations calibrated on the samples; input and
+        # output stay float32 so the backend is a drop-in replacement
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: (
+            [sample[np.newaxis]] for sample in samples
+        )
+    path = exported_path(keras_path, "tflite", quantized)
+    with open(path, "wb") as file:
+        file.write(converter.convert())
+    return path
+
+
+def export_onnx(model, keras_path, samples, quantized):
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("ONNX export needs tf2onnx: pip install tf2onnx") from e
+
+    path = exported_path(keras_path, "onnx", False)
+    signature = [tf.TensorSpec((None, *model.input_shape[1:]), tf.float32, "input")]
+    tf2onnx.convert.from_keras(model, input_signature=signature, output_path=path)
+    if not quantized:
+        return path
+
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantType,
+        quantize_static,
+    )
+
+    class SampleReader(CalibrationDataReader):
+        def __init__(self):
+            self._samples = iter(samples)
+
+        def get_next(self):
+            sample = next(self._samples, None)
+            return None if sample is None else {"input": sample[np.newaxis]}
+
+    quantized_path = exported_path(keras_path, "onnx", True)
+    quantize_static(
+        path,
+        quantized_path,
+        SampleReader(),
+        activation_type=QuantType.QInt8,
+        weight_type=QuantType.QInt8,
+    )
+    return quantized_path
+
+
+def per_image_latency_ms(model, samples):
+    start = time.perf_counter()
+    for sample in samples:
+        model.predict(sample[np.newaxis], verbose=0)
+    return (time.perf_counter() - start) * 1000 / len(samples)
+
+
+def compare(reference, exported, samples):
+    """Top-1 agreement, probability deltas and per-image latency vs the Keras outputs."""
+    outputs = exported.predict(samples)
+    delta = np.abs(outputs - reference)
+    return {
+        "top1_agreement": float(
+            np.mean(outputs.argmax(axis=1) == reference.argmax(axis=1))
+        ),
+        "max_abs_delta": float(delta.max()),
+        "mean_abs_delta": float(delta.mean()),
+        "latency_ms": per_image_latency_ms(exported, samples),
+        "size_mb": os.path.getsize(exported.path) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the Keras models to TFLite/ONNX and report accuracy deltas."
+    )
+    parser.add_argument(
+        "images", help="Directory of sample images for calibration and the report"
+    )
+    parser.add_argument(
+        "--backends", nargs="+", default=["tflite", "onnx"], choices=["tflite", "onnx"]
+    )
+    parser.add_argument("--no-int8", action="store_true", help="Skip int8 exports")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    samples = load_samples(args.images, args.limit)
+    exporters = {"tflite": export_tflite, "onnx": export_onnx}
+    variants = [False] if args.no_int8 else [False, True]
+
+    report = {}
+    for keras_path in MODEL_PATHS:
+        keras_model = load_model(keras_path)
+        reference = keras_model.predict(samples, verbose=0)
+        report[keras_path] = {
+            "keras": {
+                "latency_ms": per_image_latency_ms(keras_model, samples),
+                "size_mb": os.path.getsize(keras_path) / 1e6,
+            }
+        }
+        print(
+            f"{os.path.basename(keras_path)}: "
+            f"{report[keras_path]['keras']['latency_ms']:.1f} ms, "
+            f"{report[keras_path]['keras']['size_mb']:.1f} MB"
+        )
+
+        for backend in args.backends:
+            for quantized in variants:
+                path = exporters[backend](keras_model, keras_path, samples, quantized)
+                exported = load_backend(keras_path, backend, quantized)
+                result = compare(reference, exported, samples)
+                report[keras_path][os.path.basename(path)] = result
+                print(
+                    f"  {os.path.basename(path)}: top-1 agreement "
+                    f"{result['top1_agreement']:.3f}, max delta "
+                    f"{result['max_abs_delta']:.4f}, {result['latency_ms']:.1f} ms, "
+                    f"{result['size_mb']:.1f} MB"
+                )
+
+    with open(REPORT_PATH, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    # python -m src.scripts.convert_models path/to/sample_images
+    main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Every classifier takes 224x224 RGB
+MODEL_INPUT_SIZE = (224, 224)
+# Set INGEST_DRAFT=0 to always decode JPEGs at full resolution first
+INGEST_DRAFT = os.getenv("INGEST_DRAFT", "1") != "0"
+
+
+def to_rgb(image_array):
+    """
+    Return a frame as 3-channel uint8 RGB, copying only when it has to.
+
+    RGB uint8 frames come back unchanged and RGBA frames as a view without
+    the alpha channel; only grayscale frames and other dtypes are copied.
+    """
+    if image_array.ndim == 2:
+        image_array = np.asarray(Image.fromarray(image_array).convert("RGB"))
+    elif image_array.shape[2] == 4:
+        image_array = image_array[..., :3]
+    return image_array.astype(np.uint8, copy=False)
+
+
+def resize_for_model(image_array):
+    """The (224, 224, 3) uint8 model input for an RGB frame; a no-op if already that size."""
+    if image_array.shape[:2] == MODEL_INPUT_SIZE[::-1]:
+        return image_array
+    image = Image.fromarray(np.ascontiguousarray(image_array))
+    return np.asarray(image.resize(MODEL_INPUT_SIZE))
+
+
+class IngestedFrame:
+    """
+    A frame as the pipeline uses it: the 224x224 model input up front and
+    the full-resolution RGB frame only once something asks for it.
+
+    `full` is decoded on first access from the encoded bytes when the
+    model input came from a reduced-scale decode, so frames the models
+    settle on their own (produce) are never decoded at full size.
+    """
+
+    def __init__(self, model_input, size, data=None, full=None):
+        self.model_input = model_input
+        # (width, height) of the original frame
+        self.size = size
+        self._data = data
+        self._full = full
+        self._lock = threading.Lock()
+
+    @property
+    def full(self):
+        if self._full is None:
+            with self._lock:
+                if self._full is None:
+                    self._full = _decode(Image.open(BytesIO(self._data)))
+                    # The bytes are only needed for this one decode
+                    self._data = None
+        return self._full
+
+    @property
+    def decoded_full(self):
+        """Whether the full-resolution frame has been materialized."""
+        return self._full is not None
+
+
+def _decode(image):
+    # Modes to_rgb handles on the array; anything else (e.g. palette PNGs) goes through PIL
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    return to_rgb(np.asarray(image))
+
+
+def ingest_bytes(data):
+    """
+    Decode an encoded JPEG/WebP/PNG frame once into an IngestedFrame.
+
+    JPEGs are decoded at the smallest DCT scale (1/2 to 1/8) that still
+    covers 224x224, which skips most of the decode work and never holds
+    the full frame; their bytes are kept for a later full decode. Formats
+    without reduced-scale decoding are decoded once and the full frame is
+    kept as well.
+    """
+    image = Image.open(BytesIO(data))
+    size = image.size
+    if INGEST_DRAFT and image.format == "JPEG":
+        image.draft("RGB", MODEL_INPUT_SIZE)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        model_input = np.asarray(image.resize(MODEL_INPUT_SIZE))
+        return IngestedFrame(model_input, size, data=data)
+    return ingest_array(_decode(image))
+
+
+def ingest_array(image_array):
+    """Wrap an already decoded frame (any channel layout) as an IngestedFrame."""
+    if isinstance(image_array, IngestedFrame):
+        return image_array
+    full = to_rgb(image_array)
+    return IngestedFrame(resize_for_model(full), full.shape[1::-1], full=full)
+
+
+def _measure(fn, runs):
+    """Mean milliseconds and peak NumPy/Python allocations of `fn()`."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak
+
+
+if __name__ == "__main__":
+    # Compare the old full decode + two model resizes with the single ingest:
+    #   python -m src.scripts.frame_ingest path/to/frame.jpg
+    with open(sys.argv[1], "rb") as file:
+        data = file.read()
+
+    def full_decode():
+        image_array = np.asarray(Image.open(BytesIO(data)).convert("RGB"))
+        # identify_object and freshness_detection each resized the frame
+        for _ in range(2):
+            np.asarray(Image.fromarray(image_array).resize(MODEL_INPUT_SIZE))
+
+    def ingest():
+        ingest_bytes(data)
+
+    runs = 20
+    frame = ingest_bytes(data)
+    print(f"Frame: {frame.size[0]}x{frame.size[1]}, {len(data)} bytes")
+    for name, fn in (("Full decode + 2 resizes", full_decode), ("Single ingest", ingest)):
+        elapsed_ms, peak = _measure(fn, runs)
+        print(f"{name}: {elapsed_ms:.1f} ms, peak arrays {peak / 1024 / 1024:.1f} MB")
@@ -1,13 +1,27 @@
 import numpy as np
 import tensorflow as tf
-from tensorflow.keras.models import load_model
 from tensorflow.keras.applications.mobilenet import preprocess_input
 from tensorflow.keras.preprocessing import image
 from PIL import Image
+from src.scripts.frame_ingest import MODEL_INPUT_SIZE, resize_for_model
+from src.scripts.inference_scheduler import get_scheduler
+from src.scripts.inference_backend import load_backend
+from src.scripts.metrics import span
+from src.scripts.model_registry import registry, warmup_model
+from src.scripts.runtime_config import governor
 
-# Load the model
+# Size TensorFlow's thread pools before the first op starts them
+governor.apply_tensorflow()
+
+# Register the model (loaded on first use or during background warmup)
 model_path = "src/models/freshness_detection_model.keras"  # Update path as needed
-model = load_model(model_path)
+# INFERENCE_BACKEND picks Keras or an exported TFLite/ONNX version of the model
+registry.register("freshness", lambda: load_backend(model_path), warmup_model)
+
+# Concurrent requests are batched into a single predict call
+freshness_scheduler = get_scheduler(
+    "freshness", lambda batch: registry.get("freshness").predict(batch, verbose=0)
+)
 
 # Define class indices
 class_indices = {
@@ -44,16 +58,34 @@ class_indices = {
 # Reverse the class_indices for easy lookup
 index_to_class = {v: k for k, v in class_indices.items()}
 
+# Precomputed once: class names by output index and fresh/rotten output masks
+class_names = [index_to_class[i] for i in range(len(index_to_class))]
+fresh_mask = np.array([label.startswith("Fresh") for label in class_names])
+rotten_mask = np.array([label.startswith("Rotten") for label in class_names])
+
+# get_freshness_scale as lookup tables for np.digitize
+freshness_scale_bounds = np.array([40, 60, 80, 90])
+freshness_scale_labels = np.array(
+    ["D (Rotten)", "C (Stale)", "B (Medium Fresh)", "A (Fresh)", "A+ (Super Fresh)"]
+)
+
 
 def preprocess_image(image_array):
     """Preprocess the image NumPy array for the MobileNet model."""
-    img = Image.fromarray(image_array)
-    img = img.resize((224, 224))
-    img_array = image.img_to_array(img)
+    # Frames from frame_ingest are already 224x224 and skip the resize
+    img_array = image.img_to_array(resize_for_model(image_array))
     img_array = np.expand_dims(img_array, axis=0)
     return preprocess_input(img_array)
 
 
+def preprocess_batch(images):
+    """Resize N images into one (N, 224, 224, 3) MobileNet input batch."""
+    batch = np.empty((len(images), *MODEL_INPUT_SIZE[::-1], 3), dtype=np.float32)
+    for i, image_array in enumerate(images):
+        batch[i] = resize_for_model(image_array)
+    return preprocess_input(batch)
+
+
 def get_freshness_scale(adjusted_probability):
     """Return the freshness scale based on the adjusted probability score."""
     if 90 <= adjusted_probability <= 100:
@@ -70,46 +102,78 @@ def get_freshness_scale(adjusted_probability):
 
 def predict_freshness(image_array):
     """Predict the freshness of the uploaded image (NumPy array) and give the most suitable class and freshness scale."""
-    # Preprocess the image
-    preprocessed_image = preprocess_image(image_array)
+    return predict_freshness_batch([image_array])[0]
 
-    # Get predictions
-    predictions = model.predict(preprocessed_image)[0]
 
-    # Get the predicted class and its probability
-    predicted_index = np.argmax(predictions)
-    predicted_class = index_to_class[predicted_index]
-    predicted_probability = predictions[predicted_index] * 100
+def predict_freshness_batch(images):
+    """
+    Predict the freshness of a stack of images in one pass.
+
+    Args:
+        images (list or np.array): N RGB images as NumPy arrays.
+
+    Returns:
+        list: One (predicted_class, predicted_probability, adjusted_probability,
+        freshness_scale) tuple per image.
+    """
+    # Preprocess the images into one (N, 224, 224, 3) batch
+    with span("freshness_preprocess"):
+        preprocessed_images = preprocess_batch(images)
+
+    # Get predictions; the scheduler also merges these rows with concurrent requests
+    futures = [freshness_scheduler.submit(sample) for sample in preprocessed_images]
+    predictions = np.stack([future.result() for future in futures])
+
+    return interpret_freshness_batch(predictions)
 
-    # Separate probabilities of fresh and rotten classes
-    fresh_indices = [i for i, label in index_to_class.items() if "Fresh" in label]
-    rotten_indices = [i for i, label in index_to_class.items() if "Rotten" in label]
 
-    # Calculate the sum of probabilities for fresh and rotten classes
-    fresh_sum = np.sum([predictions[i] for i in fresh_indices]) * 100
-    rotten_sum = np.sum([predictions[i] for i in rotten_indices]) * 100
+def interpret_freshness(predictions):
+    """Turn the 28-class probability vector into class, probabilities and freshness scale."""
+    return interpret_freshness_batch(np.expand_dims(predictions, 0))[0]
 
-    # Adjusted probability calculation
-    if "Fresh" in predicted_class:
+
+def interpret_freshness_batch(predictions):
+    """
+    Turn an (N, 28) probability matrix into per-image freshness results.
+
+    The adjusted probability is the highest probability on the predicted
+    side (fresh or rotten) minus the total probability of the other side,
+    clipped to [0, 100].
+    """
+    rows = np.arange(len(predictions))
+
+    # Get the predicted class and its probability
+    predicted_index = np.argmax(predictions, axis=1)
+    predicted_probability = predictions[rows, predicted_index] * 100
+
+    # Sums and maxima of the fresh and rotten classes for every row at once
+    fresh = predictions[:, fresh_mask]
+    rotten = predictions[:, rotten_mask]
+    fresh_sum = fresh.sum(axis=1) * 100
+    rotten_sum = rotten.sum(axis=1) * 100
+
+    adjusted_probability = np.where(
+        fresh_mask[predicted_index],
         # Highest fresh probability minus total rotten probabilities
-        highest_fresh_probability = (
-            np.max([predictions[i] for i in fresh_indices]) * 100
-        )
-        adjusted_probability = highest_fresh_probability - rotten_sum
-    else:  # Predicted class is "Rotten"
+        fresh.max(axis=1) * 100 - rotten_sum,
         # Highest rotten probability minus total fresh probabilities
-        highest_rotten_probability = (
-            np.max([predictions[i] for i in rotten_indices]) * 100
-        )
-        adjusted_probability = 100 - highest_rotten_probability - fresh_sum
+        100 - rotten.max(axis=1) * 100 - fresh_sum,
+    )
 
     # Clip the adjusted probability between 0 and 100 to avoid negative scores
     adjusted_probability = np.clip(adjusted_probability, 0, 100)
 
     # Get the freshness scale based on the adjusted probability
-    freshness_scale = get_freshness_scale(adjusted_probability)
-
-    return predicted_class, predicted_probability, adjusted_probability, freshness_scale
+    freshness_scale = freshness_scale_labels[
+        np.digitize(adjusted_probability, freshness_scale_bounds)
+    ]
+
+    return [
+        (class_names[index], probability, adjusted, str(scale))
+        for index, probability, adjusted, scale in zip(
+            predicted_index, predicted_probability, adjusted_probability, freshness_scale
+        )
+    ]
 
 
 if __name__ == "__main__":
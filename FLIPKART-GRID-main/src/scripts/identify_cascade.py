@@ -0,0 +1,63 @@
+import os
+import threading
+
+# Confidence cascade: the first model's answer is accepted outright at or above
+# CASCADE_ACCEPT_CONFIDENCE, otherwise the second model runs as well. Off by
+# default: accepted rows never see the weighted comparison, so turn it on once
+# /stats/cascade shows the agreement rate is acceptable on real traffic.
+IDENTIFY_CASCADE = os.getenv("IDENTIFY_CASCADE", "0") != "0"
+CASCADE_FIRST_MODEL = os.getenv("CASCADE_FIRST_MODEL", "fine_tuned")
+CASCADE_ACCEPT_CONFIDENCE = float(os.getenv("CASCADE_ACCEPT_CONFIDENCE", "0.95"))
+CASCADE_REJECT_CONFIDENCE = float(os.getenv("CASCADE_REJECT_CONFIDENCE", "0"))
+
+
+class CascadeStats:
+    """
+    Counts how often the cascade skipped (or, while it is off, would have
+    skipped) the second model, and how often a skip would have changed the
+    answer the two-model comparison gives.
+
+    Kept apart from identify_object so reading it never loads the models.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.second_model_runs = 0
+        self.shadow_accepts = 0
+        self.shadow_disagreements = 0
+
+    def record(self, images, second_model_runs):
+        with self._lock:
+            self.images += images
+            self.second_model_runs += second_model_runs
+
+    def record_shadow(self, accepts, disagreements):
+        """Rows the cascade would have accepted, and how many of those it would have got wrong."""
+        with self._lock:
+            self.shadow_accepts += accepts
+            self.shadow_disagreements += disagreements
+
+    def stats(self):
+        with self._lock:
+            skipped = self.images - self.second_model_runs
+            return {
+                "enabled": IDENTIFY_CASCADE,
+                "first_model": CASCADE_FIRST_MODEL,
+                "accept_confidence": CASCADE_ACCEPT_CONFIDENCE,
+                "reject_confidence": CASCADE_REJECT_CONFIDENCE,
+                "images": self.images,
+                "second_model_runs": self.second_model_runs,
+                "second_model_skipped": skipped,
+                "skip_rate": skipped / self.images if self.images else 0.0,
+                # Measured while the cascade is off, with both models run on every image
+                "shadow_accepts": self.shadow_accepts,
+                "shadow_agreement_rate": (
+                    1 - self.shadow_disagreements / self.shadow_accepts
+                    if self.shadow_accepts
+                    else None
+                ),
+            }
+
+
+cascade_stats = CascadeStats()
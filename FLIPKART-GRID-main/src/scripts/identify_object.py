@@ -1,11 +1,45 @@
+import json
+import logging
+import os
 import tensorflow as tf
 import numpy as np
-from tensorflow.keras.models import load_model
 from PIL import Image
+from src.scripts.frame_ingest import MODEL_INPUT_SIZE, resize_for_model
+from src.scripts.identify_cascade import (
+    CASCADE_ACCEPT_CONFIDENCE,
+    CASCADE_FIRST_MODEL,
+    CASCADE_REJECT_CONFIDENCE,
+    IDENTIFY_CASCADE,
+    cascade_stats,
+)
+from src.scripts.inference_scheduler import get_scheduler
+from src.scripts.inference_backend import load_backend
+from src.scripts.metrics import span
+from src.scripts.model_registry import registry, warmup_model
+from src.scripts.runtime_config import governor
 
-# Step 2: Load Models
-fine_tuned_model = load_model("src/models/identification_mobilenet_finetuned.keras")
-base_model = load_model("src/models/identification_mobilenet_v2.keras")
+logger = logging.getLogger(__name__)
+
+# Size TensorFlow's thread pools before the first op starts them
+governor.apply_tensorflow()
+
+# Step 2: Register Models (loaded on first use or during background warmup)
+FINE_TUNED_MODEL_PATH = "src/models/identification_mobilenet_finetuned.keras"
+BASE_MODEL_PATH = "src/models/identification_mobilenet_v2.keras"
+
+# INFERENCE_BACKEND picks Keras or an exported TFLite/ONNX version of each model
+registry.register(
+    "fine_tuned", lambda: load_backend(FINE_TUNED_MODEL_PATH), warmup_model
+)
+registry.register("base", lambda: load_backend(BASE_MODEL_PATH), warmup_model)
+
+# Concurrent requests are batched into a single predict call per model
+fine_tuned_scheduler = get_scheduler(
+    "fine_tuned", lambda batch: registry.get("fine_tuned").predict(batch, verbose=0)
+)
+base_scheduler = get_scheduler(
+    "base", lambda batch: registry.get("base").predict(batch, verbose=0)
+)
 
 # Define the classes for your fine-tuned model
 fine_tuned_classes = {
@@ -39,16 +73,65 @@ integrated_classes = [
 ]
 
 
+# Precomputed once instead of on every call
+fine_tuned_class_names = list(fine_tuned_classes.keys())
+integrated_classes_set = set(integrated_classes)
+fine_tuned_in_list = [name in integrated_classes_set for name in fine_tuned_class_names]
+
+IMAGENET_CLASS_INDEX_URL = (
+    "https://storage.googleapis.com/download.tensorflow.org/data/"
+    "imagenet_class_index.json"
+)
+
 # Step 3: Preprocessing function for MobileNet
 def preprocess_image(image_array):
-    img = Image.fromarray(image_array)
-    img = img.resize((224, 224))
-    img_array = np.array(img)
+    # Frames from frame_ingest are already 224x224 and skip the resize
+    img_array = resize_for_model(image_array)
     img_array = np.expand_dims(img_array, axis=0)
     img_array = tf.keras.applications.mobilenet.preprocess_input(img_array)
     return img_array
 
 
+def preprocess_batch(images):
+    """Resize N images into one (N, 224, 224, 3) MobileNet input batch."""
+    batch = np.empty((len(images), *MODEL_INPUT_SIZE[::-1], 3), dtype=np.float32)
+    for i, image_array in enumerate(images):
+        batch[i] = resize_for_model(image_array)
+    return tf.keras.applications.mobilenet.preprocess_input(batch)
+
+
+def load_imagenet_labels():
+    """
+    ImageNet class names by output index, with 'bell pepper' already renamed
+    to 'Capsicum', plus a mask of the classes in `integrated_classes`.
+    """
+    path = tf.keras.utils.get_file(
+        "imagenet_class_index.json", IMAGENET_CLASS_INDEX_URL, cache_subdir="models"
+    )
+    with open(path) as file:
+        class_index = json.load(file)
+    labels = np.array(
+        [class_index[str(i)][1] for i in range(len(class_index))], dtype=object
+    )
+    # Adjust 'bell pepper' class name to 'Capsicum'
+    labels[[label.lower() == "bell pepper" for label in labels]] = "Capsicum"
+    in_list = np.array([label in integrated_classes_set for label in labels])
+    return labels, in_list
+
+
+# Loaded once (during warmup) instead of on every decode_predictions call
+registry.register("imagenet_labels", load_imagenet_labels)
+
+
+def imagenet_top_k(base_preds, top=5):
+    """(label, probability) pairs of the `top` ImageNet classes for each row."""
+    labels, _ = registry.get("imagenet_labels")
+    top_idx = np.argsort(-base_preds, axis=1)[:, :top]
+    return [
+        [(labels[i], row[i]) for i in idx] for row, idx in zip(base_preds, top_idx)
+    ]
+
+
 # Step 4: Prediction function
 def predict_image_class(image_array, weight_factor=1.2):
     """
@@ -61,55 +144,138 @@ def predict_image_class(image_array, weight_factor=1.2):
     Returns:
         str, float, bool: The predicted class, the associated confidence, and whether it is in the list.
     """
-    # Preprocess the image
-    img_array = preprocess_image(image_array)
+    return predict_image_class_batch([image_array], weight_factor)[0]
 
-    # Get predictions from fine-tuned model
-    fine_tuned_preds = fine_tuned_model.predict(img_array)
-    fine_tuned_class_idx = np.argmax(fine_tuned_preds)
-    fine_tuned_confidence = np.max(fine_tuned_preds)
 
-    # Map index to class name for fine-tuned model
-    fine_tuned_class = list(fine_tuned_classes.keys())[fine_tuned_class_idx]
+def predict_image_class_batch(images, weight_factor=1.2):
+    """
+    Predict the class of a stack of images.
 
-    print(
-        f"Fine-tuned model prediction: {fine_tuned_class} with confidence: {fine_tuned_confidence:.2f}"
-    )
+    With the cascade on, the first model runs on every image and the second
+    only on images whose first-model confidence is below
+    CASCADE_ACCEPT_CONFIDENCE. Below CASCADE_REJECT_CONFIDENCE the first
+    model's answer is dropped and the second model decides alone; in
+    between, the two are compared with `weight_factor` as before.
 
-    # Store fine-tuned result in the ans variable
-    ans = {
-        "class": fine_tuned_class,
-        "confidence": fine_tuned_confidence,
-        "in_list": fine_tuned_class in integrated_classes,
-    }
-
-    # Get predictions from base MobileNetV2 model
-    base_preds = base_model.predict(img_array)
-    decoded_preds = tf.keras.applications.mobilenet_v2.decode_predictions(
-        base_preds, top=1
-    )[0][0]
-    base_class = decoded_preds[1]
-    base_confidence = decoded_preds[2]
+    Args:
+        images (list or np.array): N RGB images as NumPy arrays.
+        weight_factor (float): Factor to weight the base model's confidence.
 
-    # Adjust 'bell pepper' class name to 'Capsicum'
-    if base_class.lower() == "bell pepper":
-        base_class = "Capsicum"
+    Returns:
+        list: One (class, confidence, in_list) tuple per image.
+    """
+    # Preprocess the images into one (N, 224, 224, 3) batch
+    with span("identify_preprocess"):
+        img_batch = preprocess_batch(images)
+    schedulers = {"fine_tuned": fine_tuned_scheduler, "base": base_scheduler}
+    first_name = CASCADE_FIRST_MODEL
+    second_name = "base" if first_name == "fine_tuned" else "fine_tuned"
 
-    print(f"Base model prediction: {base_class} with confidence: {base_confidence:.2f}")
+    if not IDENTIFY_CASCADE:
+        # Submit every row to both models before waiting, so they run side by side
+        futures = {
+            name: [scheduler.submit(sample) for sample in img_batch]
+            for name, scheduler in schedulers.items()
+        }
+        preds = {
+            name: np.stack([future.result() for future in model_futures])
+            for name, model_futures in futures.items()
+        }
+        results = resolve_image_class_batch(preds["fine_tuned"], preds["base"], weight_factor)
+        cascade_stats.record(len(img_batch), len(img_batch))
+        _record_shadow(_choices(first_name, preds[first_name]), results)
+        return results
 
-    # Apply weight factor to the base model confidence for comparison
-    weighted_base_confidence = base_confidence * weight_factor
+    first_futures = [schedulers[first_name].submit(sample) for sample in img_batch]
+    first = _choices(first_name, np.stack([f.result() for f in first_futures]))
+
+    # Only uncertain rows go to the second model
+    uncertain = [i for i, (_, conf, _) in enumerate(first) if conf < CASCADE_ACCEPT_CONFIDENCE]
+    second_futures = [schedulers[second_name].submit(img_batch[i]) for i in uncertain]
+    second = {}
+    if uncertain:
+        second_preds = np.stack([f.result() for f in second_futures])
+        second = dict(zip(uncertain, _choices(second_name, second_preds)))
+    cascade_stats.record(len(img_batch), len(uncertain))
+
+    results = []
+    for i, first_choice in enumerate(first):
+        if i not in second:
+            results.append(first_choice)
+        elif first_choice[1] < CASCADE_REJECT_CONFIDENCE:
+            results.append(second[i])
+        elif first_name == "fine_tuned":
+            results.append(_compare(first_choice, second[i], weight_factor))
+        else:
+            # Base model first: the fine-tuned answer is second[i]
+            results.append(_compare(second[i], first_choice, weight_factor))
+    return results
+
+
+def _record_shadow(first, results):
+    """With both models run, count the rows the cascade would have decided differently."""
+    accepted = [
+        i for i, (_, conf, _) in enumerate(first) if conf >= CASCADE_ACCEPT_CONFIDENCE
+    ]
+    disagreements = sum(first[i][0] != results[i][0] for i in accepted)
+    cascade_stats.record_shadow(len(accepted), disagreements)
 
-    # Compare the weighted confidence with the fine-tuned model's confidence
-    if weighted_base_confidence > ans["confidence"]:
-        ans = {
-            "class": base_class,
-            "confidence": base_confidence,
-            "in_list": base_class in integrated_classes,
-        }
 
+def _choices(model_name, preds):
+    """Top-1 (class, confidence, in_list) per row using precomputed lookups."""
+    idx = np.argmax(preds, axis=1)
+    confidence = preds[np.arange(len(preds)), idx]
+    if model_name == "fine_tuned":
+        names, in_list = fine_tuned_class_names, fine_tuned_in_list
+    else:
+        names, in_list = registry.get("imagenet_labels")
+
+    display_name = "Fine-tuned" if model_name == "fine_tuned" else "Base"
+    choices = []
+    for i, conf in zip(idx, confidence):
+        logger.debug(
+            "%s model prediction: %s with confidence: %.2f", display_name, names[i], conf
+        )
+        choices.append((str(names[i]), conf, bool(in_list[i])))
+    return choices
+
+
+def _compare(fine_tuned_choice, base_choice, weight_factor):
     # Return the class with the higher (weighted) confidence
-    return ans["class"], ans["confidence"], ans["in_list"]
+    if base_choice[1] * weight_factor > fine_tuned_choice[1]:
+        return base_choice
+    return fine_tuned_choice
+
+
+def resolve_image_class(fine_tuned_preds, base_preds, weight_factor=1.2):
+    """
+    Pick the final class from the fine-tuned and base model outputs.
+
+    Args:
+        fine_tuned_preds (np.array): Fine-tuned model probabilities, shape (1, 9).
+        base_preds (np.array): ImageNet MobileNetV2 probabilities, shape (1, 1000).
+        weight_factor (float): Factor to weight the base model's confidence.
+
+    Returns:
+        str, float, bool: The predicted class, the associated confidence, and whether it is in the list.
+    """
+    return resolve_image_class_batch(fine_tuned_preds, base_preds, weight_factor)[0]
+
+
+def resolve_image_class_batch(fine_tuned_preds, base_preds, weight_factor=1.2):
+    """
+    Pick the final class for every row of the fine-tuned (N, 9) and base
+    (N, 1000) probability matrices.
+
+    Returns:
+        list: One (class, confidence, in_list) tuple per row.
+    """
+    return [
+        _compare(fine_tuned_choice, base_choice, weight_factor)
+        for fine_tuned_choice, base_choice in zip(
+            _choices("fine_tuned", fine_tuned_preds), _choices("base", base_preds)
+        )
+    ]
 
 
 def identify_object(image_array):
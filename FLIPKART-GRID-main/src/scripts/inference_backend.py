@@ -0,0 +1,250 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# keras (default), tflite or onnx
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+# Load the int8-quantized export instead of the float32 one
+INFERENCE_QUANTIZED = os.getenv("INFERENCE_QUANTIZED", "0") == "1"
+# Keras models are called through a compiled tf.function instead of model.predict
+INFERENCE_COMPILED = os.getenv("INFERENCE_COMPILED", "1") != "0"
+# Compile that function with XLA (fixed batch shapes, results within float tolerance)
+INFERENCE_XLA = os.getenv("INFERENCE_XLA", "0") == "1"
+# Largest XLA batch shape; matches the scheduler's batch limit
+INFERENCE_XLA_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+
+BACKENDS = ("keras", "tflite", "onnx")
+
+
+def exported_path(keras_path, backend, quantized=False):
+    """
+    Path of the exported model next to its Keras original, e.g.
+    `src/models/x.keras` -> `src/models/x_int8.tflite`.
+    """
+    stem = os.path.splitext(keras_path)[0]
+    suffix = "_int8" if quantized else ""
+    return f"{stem}{suffix}.{backend}"
+
+
+class TFLiteModel:
+    """TFLite interpreter exposing the `predict` / `input_shape` subset of a Keras model."""
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+
+        self.path = path
+        self._interpreter = Interpreter(model_path=path)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+        self.input_shape = (None, *(int(dim) for dim in self._input["shape"][1:]))
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=self._input["dtype"])
+        with self._lock:
+            # Interpreters have a fixed batch dimension; resize only when it changes
+            if len(batch) != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self._interpreter.set_tensor(self._input["index"], batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"]).copy()
+
+
+class OnnxModel:
+    """ONNX Runtime session exposing the `predict` / `input_shape` subset of a Keras model."""
+
+    def __init__(self, path):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "INFERENCE_BACKEND=onnx needs onnxruntime: pip install onnxruntime"
+            ) from e
+
+        self.path = path
+        self._session = onnxruntime.InferenceSession(
+            path, providers=["CPUExecutionProvider"]
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = (None, *model_input.shape[1:])
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+class CompiledModel:
+    """
+    Keras model called through one compiled tf.function instead of `predict`.
+
+    `predict` rebuilds a data adapter, callbacks and a progress bar on every
+    call, which costs milliseconds for a single image. Here the forward pass
+    is traced once for a fixed (None, H, W, C) float32 signature and called
+    directly, running the same ops as `predict` for bit-identical outputs.
+
+    With `xla`, batch shapes are padded up to powers of two so XLA compiles
+    a handful of programs; each shape has a preallocated input buffer that
+    is reused across calls. XLA may fuse ops differently, so its outputs
+    match `predict` within float tolerance rather than exactly.
+    """
+
+    def __init__(self, model, xla=INFERENCE_XLA, max_batch=INFERENCE_XLA_MAX_BATCH):
+        import tensorflow as tf
+
+        self.model = model
+        self.xla = xla
+        self.input_shape = tuple(model.input_shape)
+        signature = tf.TensorSpec((None, *self.input_shape[1:]), tf.float32)
+        self._forward = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[signature],
+            jit_compile=xla,
+        )
+        self._buckets = []
+        size = 1
+        while size < max_batch:
+            self._buckets.append(size)
+            size *= 2
+        self._buckets.append(max(1, max_batch))
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def _call(self, batch):
+        outputs = self._forward(batch)
+        if isinstance(outputs, (list, tuple)):
+            return [output.numpy() for output in outputs]
+        return outputs.numpy()
+
+    def _call_padded(self, batch):
+        size = next((bucket for bucket in self._buckets if bucket >= len(batch)), None)
+        if size is None:
+            # Larger than any compiled shape: run it in chunks of the largest one
+            step = self._buckets[-1]
+            parts = [self._call_padded(batch[i : i + step]) for i in range(0, len(batch), step)]
+            if isinstance(parts[0], list):
+                return [np.concatenate(outputs) for outputs in zip(*parts)]
+            return np.concatenate(parts)
+
+        with self._lock:
+            buffer = self._buffers.get(size)
+            if buffer is None:
+                buffer = self._buffers[size] = np.zeros(
+                    (size, *self.input_shape[1:]), dtype=np.float32
+                )
+            # Rows past the batch keep stale samples; their outputs are dropped
+            buffer[: len(batch)] = batch
+            outputs = self._call(buffer)
+        if isinstance(outputs, list):
+            return [output[: len(batch)] for output in outputs]
+        return outputs[: len(batch)]
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if self.xla:
+            return self._call_padded(batch)
+        return self._call(batch)
+
+    def warmup(self):
+        """Trace the function (and compile every XLA batch shape) ahead of traffic."""
+        for size in self._buckets if self.xla else [1]:
+            self.predict(np.zeros((size, *self.input_shape[1:]), dtype=np.float32))
+
+
+def compile_model(model):
+    """Wrap a Keras model in CompiledModel unless INFERENCE_COMPILED=0."""
+    return CompiledModel(model) if INFERENCE_COMPILED else model
+
+
+def compare_latency(model, runs=100, batch_size=1):
+    """
+    Per-call latency of `model.predict` against the compiled function.
+
+    Returns:
+        dict: Mean microseconds per call for each path and the largest
+        absolute difference between their outputs.
+    """
+    shape = (batch_size, *model.input_shape[1:])
+    batch = np.random.default_rng(0).uniform(-1, 1, shape).astype(np.float32)
+    report = {}
+    outputs = {}
+    for name, candidate in (
+        ("predict", model),
+        ("compiled", CompiledModel(model, xla=False)),
+        ("compiled_xla", CompiledModel(model, xla=True)),
+    ):
+        outputs[name] = np.asarray(candidate.predict(batch, verbose=0))
+        start = time.perf_counter()
+        for _ in range(runs):
+            candidate.predict(batch, verbose=0)
+        report[f"{name}_us"] = (time.perf_counter() - start) * 1e6 / runs
+    for name in ("compiled", "compiled_xla"):
+        report[f"{name}_max_abs_delta"] = float(
+            np.max(np.abs(outputs[name] - outputs["predict"]))
+        )
+    report["overhead_saved_us"] = report["predict_us"] - report["compiled_us"]
+    return report
+
+
+def load_backend(keras_path, backend=None, quantized=None):
+    """
+    Load a model for the configured backend.
+
+    Args:
+        keras_path (str): Path of the Keras original; exports live next to it.
+        backend (str): keras, tflite or onnx. Defaults to INFERENCE_BACKEND.
+        quantized (bool): Use the int8 export. Defaults to INFERENCE_QUANTIZED.
+
+    Returns:
+        An object with `predict(batch, verbose=0)` and `input_shape`; for the
+        keras backend a CompiledModel (or the Keras model itself when
+        INFERENCE_COMPILED=0).
+    """
+    backend = backend or INFERENCE_BACKEND
+    quantized = INFERENCE_QUANTIZED if quantized is None else quantized
+
+    if backend == "keras":
+        from tensorflow.keras.models import load_model
+
+        return compile_model(load_model(keras_path))
+
+    path = exported_path(keras_path, backend, quantized)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} not found; export it with python -m src.scripts.convert_models"
+        )
+    if backend == "tflite":
+        return TFLiteModel(path)
+    if backend == "onnx":
+        return OnnxModel(path)
+    raise ValueError(f"Unknown INFERENCE_BACKEND {backend!r}; use one of {BACKENDS}")
+
+
+if __name__ == "__main__":
+    # Per-call overhead of predict vs the compiled function:
+    #   python -m src.scripts.inference_backend src/models/freshness_detection_model.keras
+    from tensorflow.keras.models import load_model
+
+    keras_model = load_model(sys.argv[1])
+    for batch_size in (1, 8):
+        report = compare_latency(keras_model, batch_size=batch_size)
+        print(
+            f"batch {batch_size}: predict {report['predict_us']:.0f} us, "
+            f"compiled {report['compiled_us']:.0f} us "
+            f"(max delta {report['compiled_max_abs_delta']:.2e}), "
+            f"XLA {report['compiled_xla_us']:.0f} us "
+            f"(max delta {report['compiled_xla_max_abs_delta']:.2e}), "
+            f"{report['overhead_saved_us']:.0f} us saved per call"
+        )
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+import numpy as np
+
+from src.scripts.metrics import metrics
+
+# Batching is on by default; set INFERENCE_BATCHING=0 to call the models directly
+BATCHING_ENABLED = os.getenv("INFERENCE_BATCHING", "1") != "0"
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+inference_seconds = metrics.histogram(
+    "model_inference_seconds", "Duration of each batched model call.", ["model"]
+)
+batch_size_histogram = metrics.histogram(
+    "model_batch_size", "Samples per model call.", ["model"], buckets=(1, 2, 4, 8, 16, 32)
+)
+
+
+class InferenceScheduler:
+    """
+    Collects concurrent single-sample requests for one model into batches.
+
+    Callers submit one preprocessed sample (without the batch dimension) and
+    block until their own row of the batched output is available. A batch is
+    dispatched as soon as it holds `max_batch_size` samples or the oldest
+    sample has waited `max_wait_ms`, whichever happens first.
+    """
+
+    def __init__(
+        self, name, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS
+    ):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self._requests = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._batch_sizes = {}
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"inference-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, sample):
+        """Queue a single sample and return a Future for its prediction row."""
+        future = Future()
+        if not BATCHING_ENABLED:
+            try:
+                start = time.perf_counter()
+                future.set_result(self.predict_fn(np.expand_dims(sample, axis=0))[0])
+                self._record(1, time.perf_counter() - start)
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_worker()
+        self._queue.put((sample, future))
+        return future
+
+    def predict(self, sample):
+        """Blocking helper around submit()."""
+        return self.submit(sample).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            futures = [future for _, future in batch]
+            start = time.perf_counter()
+            try:
+                outputs = self.predict_fn(np.stack([sample for sample, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            self._record(len(batch), time.perf_counter() - start)
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
+    def _record(self, batch_size, seconds):
+        inference_seconds.observe(seconds, model=self.name)
+        batch_size_histogram.observe(batch_size, model=self.name)
+        with self._lock:
+            self._requests += batch_size
+            self._batches += 1
+            self._max_batch_seen = max(self._max_batch_seen, batch_size)
+            self._batch_sizes[batch_size] = self._batch_sizes.get(batch_size, 0) + 1
+
+    def stats(self):
+        """Return queue depth and batch-size statistics for this model."""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": (
+                    self._requests / self._batches if self._batches else 0.0
+                ),
+                "max_batch_size_seen": self._max_batch_seen,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+
+# One scheduler per model, shared by every request thread
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name, predict_fn):
+    """Return the scheduler registered under `name`, creating it on first use."""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = InferenceScheduler(name, predict_fn)
+        return _schedulers[name]
+
+
+def scheduler_stats():
+    """Return stats for every registered scheduler, keyed by model name."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: scheduler.stats() for name, scheduler in schedulers.items()}
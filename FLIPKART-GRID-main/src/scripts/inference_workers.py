@@ -0,0 +1,447 @@
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from src.scripts.model_registry import registry
+from src.scripts.runtime_config import governor
+
+# Number of model-serving processes; 0 keeps inference in the web process
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# Frames in flight per worker (ring slots in its shared-memory block)
+INFERENCE_WORKER_SLOTS = int(os.getenv("INFERENCE_WORKER_SLOTS", "8"))
+# Largest frame a slot holds; bigger frames are downscaled (the models only need 224x224)
+INFERENCE_WORKER_SLOT_MB = float(os.getenv("INFERENCE_WORKER_SLOT_MB", "6.3"))
+# "" (no pinning), "auto" (split the available cores evenly) or per-worker
+# core lists separated by semicolons, e.g. "0,1;2,3"
+INFERENCE_WORKER_CORES = os.getenv("INFERENCE_WORKER_CORES", "")
+# Largest batch a worker builds from the frames waiting in its queue
+INFERENCE_WORKER_MAX_BATCH = int(os.getenv("INFERENCE_WORKER_MAX_BATCH", "8"))
+# Longest wait for a free slot or a result before the request fails
+INFERENCE_WORKER_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_WORKER_TIMEOUT_SECONDS", "30"))
+# Longest wait for every worker to load and warm its models
+INFERENCE_WORKER_START_TIMEOUT_SECONDS = float(
+    os.getenv("INFERENCE_WORKER_START_TIMEOUT_SECONDS", "600")
+)
+# How often the result collector checks for workers that died
+_WATCHDOG_INTERVAL_SECONDS = 1.0
+
+
+def plan_cores(workers, spec=INFERENCE_WORKER_CORES):
+    """Core set per worker for a pinning spec, or None per worker when unpinned."""
+    if not spec:
+        return [None] * workers
+    if spec == "auto":
+        available = sorted(os.sched_getaffinity(0))
+        if len(available) < workers:
+            return [None] * workers
+        return [set(cores.tolist()) for cores in np.array_split(available, workers)]
+    plans = [
+        {int(core) for core in part.split(",") if core.strip()}
+        for part in spec.split(";")
+    ]
+    if len(plans) != workers:
+        raise ValueError(
+            f"INFERENCE_WORKER_CORES lists {len(plans)} core sets for {workers} workers"
+        )
+    return plans
+
+
+def _fit_to_slot(image_array, slot_bytes):
+    """Downscale a frame whose pixels do not fit in one slot."""
+    if image_array.nbytes <= slot_bytes:
+        return image_array
+    scale = (slot_bytes / image_array.nbytes) ** 0.5
+    height, width = image_array.shape[:2]
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return np.asarray(Image.fromarray(image_array).resize(size, Image.BILINEAR))
+
+
+def _worker_main(index, shm_name, slot_bytes, tasks, results, cores, max_batch):
+    """Entry point of a model-serving process."""
+    if cores:
+        os.sched_setaffinity(0, cores)
+        # The worker owns its cores, so its libraries may use all of them
+        governor.configure(profile="latency", affinity="")
+    # Batching across requests happens here; the in-process scheduler would only add a hop
+    os.environ["INFERENCE_BATCHING"] = "0"
+
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not hand ownership of the block to this process
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    try:
+        from src.scripts.freshness_detection import predict_freshness_batch
+        from src.scripts.identify_object import predict_image_class_batch
+
+        registry.warmup()
+        results.put(("ready", index, None))
+    except Exception as e:
+        results.put(("ready", index, str(e)))
+        return
+
+    handlers = {
+        "identify": lambda frames, **options: [
+            (str(name), float(confidence), bool(in_list))
+            for name, confidence, in_list in predict_image_class_batch(frames, **options)
+        ],
+        "freshness": lambda frames, **options: [
+            (str(name), float(probability), float(adjusted), str(scale))
+            for name, probability, adjusted, scale in predict_freshness_batch(frames)
+        ],
+    }
+
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+        # Drain whatever else is already waiting into the same batch
+        batch = [message]
+        while len(batch) < max_batch:
+            try:
+                message = tasks.get_nowait()
+            except queue.Empty:
+                break
+            if message is None:
+                tasks.put(None)
+                break
+            batch.append(message)
+
+        # Frames of one task with the same options (e.g. weight_factor) form a batch
+        for task, options in dict.fromkeys((m[1], m[4]) for m in batch):
+            group = [m for m in batch if m[1] == task and m[4] == options]
+            frames = [
+                np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+                for _, _, slot, shape, _ in group
+            ]
+            try:
+                outputs, error = handlers[task](frames, **dict(options)), None
+            except Exception as e:
+                outputs, error = [None] * len(group), str(e)
+            del frames
+            for (request_id, _, slot, _, _), output in zip(group, outputs):
+                results.put(("result", request_id, index, slot, output, error))
+
+    shm.close()
+
+
+class InferenceWorkerPool:
+    """
+    Serves identification and freshness from separate processes.
+
+    Each worker owns a shared-memory block split into `slots` frame slots.
+    `submit` copies a decoded frame straight into a free slot and sends
+    only its (slot, shape) over the task queue, so pixels are never
+    pickled. Workers batch whatever is waiting, run the batch APIs and send
+    back the small result tuples; the slot then goes back on the free list.
+    Free slots of every worker share one queue, so frames go to whichever
+    worker has room.
+
+    A worker that dies (e.g. OOM-killed) is noticed by the result
+    collector: its in-flight requests fail, its slots are dropped and the
+    remaining workers carry on. Waits for slots and results time out
+    after `timeout` seconds instead of hanging the request.
+    """
+
+    def __init__(
+        self,
+        workers=INFERENCE_WORKERS,
+        slots=INFERENCE_WORKER_SLOTS,
+        slot_mb=INFERENCE_WORKER_SLOT_MB,
+        cores=None,
+        max_batch=INFERENCE_WORKER_MAX_BATCH,
+        timeout=INFERENCE_WORKER_TIMEOUT_SECONDS,
+    ):
+        context = multiprocessing.get_context("spawn")
+        self.workers = max(1, workers)
+        self.slot_bytes = int(slot_mb * 1024 * 1024)
+        self.cores = cores if cores is not None else plan_cores(self.workers)
+        self.timeout = timeout
+
+        # request_id -> (future, worker index)
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._free_slots = queue.Queue()
+        self._ready = threading.Event()
+        self._ready_count = 0
+        self._started = set()
+        self._dead = set()
+        self.errors = []
+        self.frames = 0
+        self.downscaled = 0
+
+        self._results = context.Queue()
+        self._blocks = []
+        self._tasks = []
+        self._processes = []
+        for index in range(self.workers):
+            block = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+            tasks = context.Queue()
+            process = context.Process(
+                target=_worker_main,
+                args=(
+                    index,
+                    block.name,
+                    self.slot_bytes,
+                    tasks,
+                    self._results,
+                    self.cores[index],
+                    max_batch,
+                ),
+                name=f"inference-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._blocks.append(block)
+            self._tasks.append(tasks)
+            self._processes.append(process)
+            for slot in range(slots):
+                self._free_slots.put((index, slot))
+
+        self._collector = threading.Thread(
+            target=self._collect, name="inference-results", daemon=True
+        )
+        self._collector.start()
+        atexit.register(self.close)
+
+    def wait_ready(self, timeout=None):
+        """Block until every worker has loaded and warmed its models."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("Inference workers did not start in time")
+        if self.errors:
+            raise RuntimeError(f"Inference workers failed to start: {self.errors}")
+
+    def _mark_started(self, index, error=None):
+        if index in self._started:
+            return
+        self._started.add(index)
+        if error:
+            self.errors.append(f"worker {index}: {error}")
+        self._ready_count += 1
+        if self._ready_count == self.workers:
+            self._ready.set()
+
+    def _check_workers(self):
+        """Fail the requests of workers that exited and stop handing them frames."""
+        for index, process in enumerate(self._processes):
+            if index in self._dead or process.is_alive():
+                continue
+            self._dead.add(index)
+            error = f"worker {index} exited with code {process.exitcode}"
+            # A worker that dies while loading would otherwise keep wait_ready blocked
+            self._mark_started(index, error)
+            with self._lock:
+                pending = [
+                    request_id
+                    for request_id, (_, owner) in self._futures.items()
+                    if owner == index
+                ]
+                futures = [self._futures.pop(request_id)[0] for request_id in pending]
+            for future in futures:
+                future.set_exception(RuntimeError(error))
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            # Checked on a clock, not only when idle: the surviving workers'
+            # results would otherwise keep a dead one from being noticed
+            if time.monotonic() - last_check >= _WATCHDOG_INTERVAL_SECONDS:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                message = self._results.get(timeout=_WATCHDOG_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+            if message is None:
+                return
+            if message[0] == "ready":
+                _, index, error = message
+                self._mark_started(index, error)
+                continue
+
+            _, request_id, index, slot, output, error = message
+            self._free_slots.put((index, slot))
+            with self._lock:
+                future, _ = self._futures.pop(request_id, (None, None))
+            if future is None:
+                continue
+            if error is None:
+                future.set_result(output)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _take_slot(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if len(self._dead) == self.workers:
+                raise RuntimeError("Every inference worker has exited")
+            try:
+                remaining = max(0.0, deadline - time.monotonic())
+                index, slot = self._free_slots.get(
+                    timeout=min(_WATCHDOG_INTERVAL_SECONDS, remaining)
+                )
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"No free inference worker slot within {self.timeout}s")
+                continue
+            # Slots of dead workers are dropped as they come up
+            if index not in self._dead:
+                return index, slot
+
+    def submit(self, task, image_array, **options):
+        """
+        Hand one RGB uint8 frame to a worker; returns a Future for its result.
+
+        `options` are passed on to the task's batch function, e.g. weight_factor.
+        """
+        image_array = np.ascontiguousarray(image_array, dtype=np.uint8)
+        fitted = _fit_to_slot(image_array, self.slot_bytes)
+
+        index, slot = self._take_slot()
+        block = self._blocks[index]
+        view = np.ndarray(
+            fitted.shape, dtype=np.uint8, buffer=block.buf, offset=slot * self.slot_bytes
+        )
+        view[...] = fitted
+        del view
+
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            future.request_id = request_id
+            self._futures[request_id] = (future, index)
+            self.frames += 1
+            self.downscaled += fitted is not image_array
+        options = tuple(sorted(options.items()))
+        self._tasks[index].put((request_id, task, slot, fitted.shape, options))
+        return future
+
+    def run(self, task, images, **options):
+        """Submit every frame before waiting, so the workers can batch them."""
+        futures = [self.submit(task, image_array, **options) for image_array in images]
+        deadline = time.monotonic() + self.timeout
+        try:
+            return [
+                future.result(timeout=max(0.0, deadline - time.monotonic()))
+                for future in futures
+            ]
+        except FutureTimeoutError:
+            # A hung (not dead) worker never answers; forget these requests.
+            # Their slots come back if it ever does.
+            with self._lock:
+                for future in futures:
+                    self._futures.pop(future.request_id, None)
+            raise
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._futures)
+        return {
+            "workers": self.workers,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "dead": sorted(self._dead),
+            "cores": [sorted(cores) if cores else None for cores in self.cores],
+            "free_slots": self._free_slots.qsize(),
+            "in_flight": in_flight,
+            "frames": self.frames,
+            "downscaled": self.downscaled,
+        }
+
+    def close(self):
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+        self._tasks = []
+
+
+def _start_pool():
+    pool = InferenceWorkerPool()
+    try:
+        pool.wait_ready(INFERENCE_WORKER_START_TIMEOUT_SECONDS)
+    except Exception:
+        pool.close()
+        raise
+    return pool
+
+
+# Started (and waited on) by the background warmup like any other model; never
+# inside a worker, which imports this module too
+registry.register(
+    "inference_workers",
+    _start_pool,
+    eager=INFERENCE_WORKERS > 0 and multiprocessing.parent_process() is None,
+)
+
+
+# Same signatures as the in-process functions in identify_object / freshness_detection
+def identify_object(image_array):
+    return registry.get("inference_workers").run("identify", [image_array])[0]
+
+
+def predict_image_class_batch(images, weight_factor=1.2):
+    return registry.get("inference_workers").run(
+        "identify", images, weight_factor=weight_factor
+    )
+
+
+def predict_freshness(image_array):
+    return registry.get("inference_workers").run("freshness", [image_array])[0]
+
+
+def predict_freshness_batch(images):
+    return registry.get("inference_workers").run("freshness", images)
+
+
+def benchmark(frames, worker_counts, requests=200, concurrency=16):
+    """Frames per second through pools of different sizes, all cores auto-pinned."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    report = {}
+    for workers in worker_counts:
+        pool = InferenceWorkerPool(workers=workers, cores=plan_cores(workers, "auto"))
+        pool.wait_ready(INFERENCE_WORKER_START_TIMEOUT_SECONDS)
+        pool.run("identify", frames)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            list(
+                clients.map(
+                    lambda i: pool.run("identify", [frames[i % len(frames)]]),
+                    range(requests),
+                )
+            )
+        report[workers] = requests / (time.perf_counter() - start)
+        pool.close()
+    return report
+
+
+if __name__ == "__main__":
+    # python -m src.scripts.inference_workers image.jpg [max_workers]
+    frame = np.array(Image.open(sys.argv[1]).convert("RGB"))
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    counts = sorted({1, *range(2, max_workers + 1, 2), max_workers})
+    report = benchmark([frame], counts)
+    for workers, throughput in report.items():
+        print(
+            f"{workers} worker(s): {throughput:.1f} frames/s "
+            f"({throughput / report[counts[0]]:.2f}x)"
+        )
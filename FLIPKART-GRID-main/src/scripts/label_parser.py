@@ -0,0 +1,416 @@
+import calendar
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+# Set LABEL_FAST_PATH=0 to send every label to the LLM as before
+LABEL_FAST_PATH_ENABLED = os.getenv("LABEL_FAST_PATH", "1") != "0"
+# Answer from the rules alone, with "NA" for unread fields, at or above this
+# mean field confidence. Everything but the name (no catalogue entry) scores
+# about 0.8, without name and brand 0.67. Set above 1 to always ask the LLM
+# for missing fields.
+LABEL_SKIP_LLM_CONFIDENCE = float(os.getenv("LABEL_SKIP_LLM_CONFIDENCE", "0.75"))
+# Optional JSON list of {"name", "brand", "aliases"} for the store's catalogue
+LABEL_CATALOG_PATH = os.getenv("LABEL_CATALOG_PATH", "")
+
+FIELDS = ("name", "brand", "pack_size", "mfg_date", "exp_date", "mrp")
+
+# Common Indian FMCG brands (and makers printed on the back of the pack)
+KNOWN_BRANDS = {
+    "amul": "Amul",
+    "britannia": "Britannia",
+    "cadbury": "Cadbury",
+    "mondelez": "Cadbury",
+    "parle": "Parle",
+    "nestle": "Nestle",
+    "maggi": "Nestle",
+    "haldiram": "Haldiram's",
+    "dabur": "Dabur",
+    "patanjali": "Patanjali",
+    "tata": "Tata",
+    "colgate": "Colgate",
+    "dettol": "Dettol",
+    "lifebuoy": "Lifebuoy",
+    "surf excel": "Surf Excel",
+    "kissan": "Kissan",
+    "lays": "Lay's",
+    "kurkure": "Kurkure",
+    "sunfeast": "Sunfeast",
+    "bingo": "Bingo",
+    "aashirvaad": "Aashirvaad",
+    "fortune": "Fortune",
+    "mother dairy": "Mother Dairy",
+    "bournvita": "Cadbury",
+    "horlicks": "Horlicks",
+    "himalaya": "Himalaya",
+    "clinic plus": "Clinic Plus",
+    "vim": "Vim",
+}
+
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+
+# Letters OCR commonly returns for digits inside a price
+_DIGIT_FIXES = str.maketrans(
+    {"O": "0", "o": "0", "Q": "0", "D": "0", "I": "1", "l": "1", "|": "1"}
+)
+
+# Grouped thousands ("1,299.00", Indian "1,00,000") before plain digits; a
+# price directly followed by ",<digit>" was cut short and is rejected
+_GROUPED_PRICE = r"\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?"
+_MRP_RE = re.compile(
+    r"M\.?\s?R\.?\s?P\.?[^A-Za-z0-9]{0,6}(?:(?:Rs|INR)\.?|₹)?\s*[:.]?\s*"
+    r"(" + _GROUPED_PRICE + r"|[0-9OoQDIl|]{1,5}(?:\.\d{1,2})?)(?![A-Za-z0-9]|,\d)",
+    re.IGNORECASE,
+)
+_PRICE_RE = re.compile(
+    r"(?:(?:Rs|INR)\.?|₹)\s*(" + _GROUPED_PRICE + r"|\d{1,5}(?:\.\d{1,2})?)(?!\d|,\d)",
+    re.IGNORECASE,
+)
+
+_PACK_RE = re.compile(
+    r"(?<![\d.])(\d+(?:\.\d+)?)\s*(kg|gms|gm|g|mg|ml|ltr|litre|liter|l)(?![a-z])",
+    re.IGNORECASE,
+)
+_NET_RE = re.compile(r"net\s*(?:wt|weight|qty|quantity|content|vol)", re.IGNORECASE)
+_PER_RE = re.compile(r"per\s*$", re.IGNORECASE)
+_UNITS = {"gms": "g", "gm": "g", "ltr": "l", "litre": "l", "liter": "l"}
+
+_NUMERIC_DATE_RE = re.compile(
+    r"(?<![\d.])(\d{1,2})\s*[/\-.]\s*(\d{1,2})\s*[/\-.]\s*(\d{4}|\d{2})(?![\d])"
+)
+_MONTH_YEAR_RE = re.compile(r"(?<![\d/])(0?[1-9]|1[0-2])\s*[/\-.]\s*(20\d{2})(?![\d])")
+# "Exp: 12/24"; too easily a fraction or a price on its own, so only
+# taken right after a Mfg/Exp keyword
+_SHORT_MONTH_YEAR_RE = re.compile(
+    r"(?<![\d/.])(0?[1-9]|1[0-2])\s*[/\-]\s*(\d{2})(?!\d|\s*[/\-.]\s*\d)"
+)
+_NAMED_DATE_RE = re.compile(
+    r"(?:(\d{1,2})\s*[-/ ]?\s*)?(" + "|".join(_MONTHS) + r")[a-z]*\.?"
+    r"\s*[-/' ]?\s*(\d{4}|\d{2})(?!\d)",
+    re.IGNORECASE,
+)
+_MFG_RE = re.compile(
+    r"(mfg|mfd|mf\.|manufactur|pkd|packed|packing|d\.?o\.?m)", re.IGNORECASE
+)
+_EXP_RE = re.compile(r"(exp|use\s*by|best\s*before|bb\b)", re.IGNORECASE)
+_SHELF_LIFE_RE = re.compile(
+    r"best\s*before\s*(?:\w+\s*){0,2}?(\d{1,2})\s*months", re.IGNORECASE
+)
+
+
+@dataclass
+class LabelParse:
+    """Fields the rules could read from a label, with a 0-1 confidence each."""
+
+    details: dict
+    field_confidence: dict = field(default_factory=dict)
+
+    @property
+    def confidence(self):
+        return sum(self.field_confidence.get(name, 0.0) for name in FIELDS) / len(FIELDS)
+
+    @property
+    def missing(self):
+        return [name for name in FIELDS if name not in self.details]
+
+    @property
+    def answers_alone(self):
+        """Whether the rules are confident enough that the LLM is not asked."""
+        return not self.missing or self.confidence >= LABEL_SKIP_LLM_CONFIDENCE
+
+
+def _year(value):
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _end_of_month(year, month):
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def parse_date(text, end_of_month=False):
+    """
+    Parse one printed date (dd/mm/yy, dd-mm-yyyy, mm/yyyy, mm/yy,
+    'Mar 2024', '12 MAR 24' or ISO) into a date, or None.
+
+    Dates without a day are the 1st of their month, or the last day with
+    `end_of_month` (how a month-only expiry date is meant).
+    """
+    text = text.strip()
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    match = _NUMERIC_DATE_RE.fullmatch(text)
+    if match:
+        day, month, year = match.groups()
+        return _safe_date(_year(year), int(month), int(day))
+    match = _MONTH_YEAR_RE.fullmatch(text) or _SHORT_MONTH_YEAR_RE.fullmatch(text)
+    if match:
+        return _month_date(_year(match.group(2)), int(match.group(1)), end_of_month)
+    match = _NAMED_DATE_RE.fullmatch(text)
+    if match:
+        day, month, year = match.groups()
+        if day is None:
+            return _month_date(_year(year), _MONTHS[month[:3].lower()], end_of_month)
+        return _safe_date(_year(year), _MONTHS[month[:3].lower()], int(day))
+    return None
+
+
+def _month_date(year, month, end_of_month):
+    if not 1 <= month <= 12:
+        return None
+    return _end_of_month(year, month) if end_of_month else date(year, month, 1)
+
+
+def format_date(value, day_known=True):
+    """The dd/mm/yy format the LLM is asked to return, or mm/yy for a month-only date."""
+    return value.strftime("%d/%m/%y" if day_known else "%m/%y")
+
+
+def _date_keyword_before(text, start):
+    context = text[max(0, start - 15) : start]
+    return bool(_MFG_RE.search(context) or _EXP_RE.search(context))
+
+
+def _find_dates(text):
+    """(start, date, day_known, end) for every plausible date, in text order."""
+    found = []
+    for regex in (_NUMERIC_DATE_RE, _NAMED_DATE_RE, _MONTH_YEAR_RE, _SHORT_MONTH_YEAR_RE):
+        for match in regex.finditer(text):
+            if any(start <= match.start() < end for start, _, _, end in found):
+                continue
+            if regex is _SHORT_MONTH_YEAR_RE and not _date_keyword_before(text, match.start()):
+                continue
+            value = parse_date(match.group(0))
+            if value is None or not 2000 <= value.year <= 2099:
+                continue
+            day_known = regex is _NUMERIC_DATE_RE or (
+                regex is _NAMED_DATE_RE and match.group(1) is not None
+            )
+            found.append((match.start(), value, day_known, match.end()))
+    return sorted(found)
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    return _safe_date(year, month, min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def _parse_dates(text, result):
+    # (date, confidence, day_known); a month-only expiry runs to the end of its month
+    def as_expiry(value, confidence, day_known):
+        if not day_known:
+            value = _end_of_month(value.year, value.month)
+        return value, confidence, day_known
+
+    dates = _find_dates(text)
+    mfg = exp = None
+    for start, value, day_known, _ in dates:
+        context = text[max(0, start - 30) : start]
+        mfg_at = max((m.end() for m in _MFG_RE.finditer(context)), default=-1)
+        exp_at = max((m.end() for m in _EXP_RE.finditer(context)), default=-1)
+        # The nearest keyword before the date decides what it is
+        if mfg_at > exp_at and mfg is None:
+            mfg = (value, 1.0, day_known)
+        elif exp_at > mfg_at and exp is None:
+            exp = as_expiry(value, 1.0, day_known)
+
+    unlabelled = {value: day_known for _, value, day_known, _ in dates}
+    if mfg is None and exp is None and len(unlabelled) == 2:
+        # Two bare dates: the earlier is manufacture, the later expiry
+        first, second = sorted(unlabelled)
+        mfg = (first, 0.8, unlabelled[first])
+        exp = as_expiry(second, 0.8, unlabelled[second])
+
+    if mfg is not None and exp is None:
+        shelf_life = _SHELF_LIFE_RE.search(text)
+        if shelf_life:
+            value = _add_months(mfg[0], int(shelf_life.group(1)))
+            if value is not None:
+                exp = as_expiry(value, 0.9, mfg[2])
+
+    if mfg is not None and exp is not None and mfg[0] >= exp[0]:
+        return
+    for name, found in (("mfg_date", mfg), ("exp_date", exp)):
+        if found is not None:
+            value, confidence, day_known = found
+            # Month-only dates stay mm/yy rather than gaining an invented day
+            result.details[name] = format_date(value, day_known)
+            result.field_confidence[name] = confidence
+
+
+def _parse_mrp(text, result):
+    for match in _MRP_RE.finditer(text):
+        raw = match.group(1).replace(",", "")
+        value = raw.translate(_DIGIT_FIXES)
+        if not value.replace(".", "", 1).isdigit():
+            continue
+        # A short run of misread letters is more likely a word than a price
+        if not any(char.isdigit() for char in raw) and len(raw) < 3:
+            continue
+        result.details["mrp"] = value
+        result.field_confidence["mrp"] = 1.0 if raw == value else 0.8
+        return
+    prices = {match.group(1).replace(",", "") for match in _PRICE_RE.finditer(text)}
+    if len(prices) == 1:
+        result.details["mrp"] = prices.pop()
+        result.field_confidence["mrp"] = 0.7
+
+
+def _parse_pack_size(text, result):
+    candidates = []
+    for match in _PACK_RE.finditer(text):
+        before = text[max(0, match.start() - 25) : match.start()]
+        if _PER_RE.search(before):
+            continue  # "per 100 g" nutrition rows
+        unit = match.group(2).lower()
+        value = f"{match.group(1)} {_UNITS.get(unit, unit)}"
+        candidates.append((bool(_NET_RE.search(before)), value))
+    net = [value for is_net, value in candidates if is_net]
+    if net:
+        result.details["pack_size"] = net[0]
+        result.field_confidence["pack_size"] = 1.0
+    elif len({value for _, value in candidates}) == 1:
+        result.details["pack_size"] = candidates[0][1]
+        result.field_confidence["pack_size"] = 0.7
+
+
+def _load_catalog(path):
+    if not path:
+        return []
+    with open(path) as file:
+        entries = json.load(file)
+    return [
+        (
+            entry["name"],
+            entry.get("brand"),
+            [
+                re.compile(r"\b" + re.escape(alias) + r"\b", re.IGNORECASE)
+                for alias in [entry["name"], *entry.get("aliases", [])]
+            ],
+        )
+        for entry in entries
+    ]
+
+
+_catalog = _load_catalog(LABEL_CATALOG_PATH)
+_BRAND_RES = [
+    (re.compile(r"\b" + re.escape(key) + r"\b", re.IGNORECASE), brand)
+    for key, brand in KNOWN_BRANDS.items()
+]
+
+
+def _parse_name_and_brand(text, result):
+    for name, brand, patterns in _catalog:
+        if any(pattern.search(text) for pattern in patterns):
+            result.details["name"] = name
+            result.field_confidence["name"] = 1.0
+            if brand:
+                result.details["brand"] = brand
+                result.field_confidence["brand"] = 1.0
+            return
+    brands = {brand for pattern, brand in _BRAND_RES if pattern.search(text)}
+    if len(brands) == 1:
+        result.details["brand"] = brands.pop()
+        result.field_confidence["brand"] = 0.9
+
+
+def parse_label_text(text):
+    """
+    Read MRP, manufacture/expiry dates, pack size and (from the catalogue
+    or brand list) name and brand out of OCR text with compiled rules.
+
+    Returns:
+        LabelParse: The fields found, their confidences and the fields left
+        for the LLM.
+    """
+    result = LabelParse(details={})
+    _parse_mrp(text, result)
+    _parse_dates(text, result)
+    _parse_pack_size(text, result)
+    _parse_name_and_brand(text, result)
+    return result
+
+
+class FastPathStats:
+    """How often the rules answered alone, and the LLM time that saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.labels = 0
+        self.skipped_llm = 0
+        self.partial = 0
+        self.field_hits = dict.fromkeys(FIELDS, 0)
+        self.parse_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def record_parse(self, parsed, seconds):
+        with self._lock:
+            self.labels += 1
+            self.parse_seconds += seconds
+            for name in parsed.details:
+                self.field_hits[name] += 1
+            if parsed.answers_alone:
+                self.skipped_llm += 1
+            elif parsed.details:
+                self.partial += 1
+
+    def record_llm(self, seconds):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            avg_llm = self.llm_seconds / self.llm_calls if self.llm_calls else None
+            return {
+                "enabled": LABEL_FAST_PATH_ENABLED,
+                "skip_llm_confidence": LABEL_SKIP_LLM_CONFIDENCE,
+                "labels": self.labels,
+                "skipped_llm": self.skipped_llm,
+                "skip_fraction": self.skipped_llm / self.labels if self.labels else 0.0,
+                "partial": self.partial,
+                "field_hit_rate": {
+                    name: hits / self.labels if self.labels else 0.0
+                    for name, hits in self.field_hits.items()
+                },
+                "avg_parse_ms": (
+                    self.parse_seconds * 1000 / self.labels if self.labels else 0.0
+                ),
+                "avg_llm_ms": avg_llm * 1000 if avg_llm is not None else None,
+                # Each skipped label would have cost one average LLM round trip
+                "latency_saved_seconds": (
+                    self.skipped_llm * avg_llm if avg_llm is not None else None
+                ),
+            }
+
+
+fast_path_stats = FastPathStats()
+
+
+if __name__ == "__main__":
+    # python -m src.scripts.label_parser "MRP Rs 100 Mfg 01/02/22 Best before 9 months Net Wt 80 g"
+    start = time.perf_counter()
+    parsed = parse_label_text(" ".join(sys.argv[1:]))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(json.dumps(parsed.details, indent=2))
+    print(
+        f"Confidence: {parsed.confidence:.2f}, missing: {parsed.missing}, "
+        f"LLM skipped: {parsed.answers_alone}"
+    )
+    print(f"Parsed in {elapsed_ms:.3f} ms")
@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+# Set MODEL_WARMUP=0 to skip the background warmup and load models on first use
+WARMUP_ENABLED = os.getenv("MODEL_WARMUP", "1") != "0"
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_model(model):
+    """Run one dummy inference so graph tracing happens before the first request."""
+    if hasattr(model, "warmup"):
+        # CompiledModel traces (and XLA-compiles) each of its batch shapes
+        model.warmup()
+        return
+    # Dynamic dimensions are None (Keras/TFLite) or symbolic names (ONNX)
+    shape = tuple(dim if isinstance(dim, int) else 1 for dim in model.input_shape)
+    model.predict(np.zeros(shape, dtype=np.float32), verbose=0)
+
+
+class _Entry:
+    def __init__(self, loader, warmup, eager):
+        self.loader = loader
+        self.warmup = warmup
+        self.eager = eager
+        self.lock = threading.Lock()
+        self.instance = None
+        self.state = "registered"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+
+class ModelRegistry:
+    """
+    Loads models and clients on first use instead of at import time.
+
+    Every entry is registered with a loader and an optional warmup function.
+    `start_background_warmup()` loads and warms every eager entry on a
+    daemon thread so the web server can start serving immediately and
+    report readiness once the models are usable.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+        self.started_at = time.monotonic()
+        self.ready_seconds = None
+        self.first_request_ms = None
+
+    def register(self, name, loader, warmup=None, eager=True):
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(loader, warmup, eager)
+
+    def get(self, name):
+        """Return the loaded instance for `name`, loading it if needed."""
+        entry = self._entries[name]
+        if entry.instance is not None:
+            return entry.instance
+        with entry.lock:
+            if entry.instance is None:
+                entry.state = "loading"
+                start = time.perf_counter()
+                try:
+                    instance = entry.loader()
+                except Exception as e:
+                    entry.state = "failed"
+                    entry.error = str(e)
+                    raise
+                entry.load_seconds = time.perf_counter() - start
+                entry.instance = instance
+                entry.state = "loaded"
+        return entry.instance
+
+    def peek(self, name):
+        """Return the instance for `name` if it is already loaded, else None."""
+        entry = self._entries.get(name)
+        return entry.instance if entry is not None else None
+
+    def _warm(self, name):
+        entry = self._entries[name]
+        instance = self.get(name)
+        if entry.warmup is not None and entry.state != "ready":
+            start = time.perf_counter()
+            entry.warmup(instance)
+            entry.warmup_seconds = time.perf_counter() - start
+        entry.state = "ready"
+
+    def warmup(self):
+        """Load and warm every eager entry, recording failures instead of raising."""
+        with self._lock:
+            names = [name for name, entry in self._entries.items() if entry.eager]
+        for name in names:
+            try:
+                self._warm(name)
+            except Exception as e:
+                entry = self._entries[name]
+                entry.state = "failed"
+                entry.error = str(e)
+                logger.exception("Warmup failed for %s", name)
+        if self.is_ready() and self.ready_seconds is None:
+            self.ready_seconds = time.monotonic() - self.started_at
+
+    def start_background_warmup(self, before_warmup=None):
+        """
+        Warm up on a daemon thread. `before_warmup` runs first on the same
+        thread, e.g. to import the modules that register their models.
+        """
+        if self._warmup_thread is not None:
+            return
+
+        def run():
+            if before_warmup is not None:
+                before_warmup()
+            self.warmup()
+
+        self._warmup_thread = threading.Thread(
+            target=run, name="model-warmup", daemon=True
+        )
+        self._warmup_thread.start()
+
+    def is_ready(self):
+        """
+        Whether requests can be served: every eager entry warmed up, or,
+        with MODEL_WARMUP=0, nothing failed (models load on first use then,
+        so waiting for "ready" would never end).
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        if not WARMUP_ENABLED:
+            return not any(entry.state == "failed" for entry in entries if entry.eager)
+        return bool(entries) and all(
+            entry.state == "ready" for entry in entries if entry.eager
+        )
+
+    def record_first_request(self, latency_ms):
+        if self.first_request_ms is None:
+            self.first_request_ms = latency_ms
+
+    def status(self):
+        """Per-entry state plus startup and first-request metrics."""
+        with self._lock:
+            entries = dict(self._entries)
+        return {
+            "ready": self.is_ready(),
+            "uptime_seconds": time.monotonic() - self.started_at,
+            "startup_seconds": self.ready_seconds,
+            "first_request_ms": self.first_request_ms,
+            "models": {
+                name: {
+                    "state": entry.state,
+                    "eager": entry.eager,
+                    "load_seconds": entry.load_seconds,
+                    "warmup_seconds": entry.warmup_seconds,
+                    "error": entry.error,
+                }
+                for name, entry in entries.items()
+            },
+        }
+
+
+# Process-wide registry shared by every model module
+registry = ModelRegistry()
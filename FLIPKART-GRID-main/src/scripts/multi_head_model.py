@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from PIL import Image
+
+from src.scripts import identify_object, freshness_detection
+from src.scripts.inference_backend import CompiledModel, compile_model
+from src.scripts.inference_scheduler import get_scheduler
+from src.scripts.model_registry import registry, warmup_model
+
+MULTI_HEAD_MODEL_PATH = "src/models/multi_head_model.keras"
+
+# Last spatial layer of the ImageNet MobileNetV2 graph, shared by every head
+BACKBONE_OUTPUT_LAYER = "out_relu"
+
+
+@dataclass
+class ProduceResult:
+    """Everything `imageResults` needs from one pass over a produce frame."""
+
+    predicted_class: str
+    confidence: float
+    in_list: bool
+    imagenet_top_k: list
+    freshness_class: str
+    predicted_probability: float
+    adjusted_probability: float
+    freshness_scale: str
+
+
+def _split_head(model):
+    """
+    Split a `backbone + classifier` Keras model into its nested backbone and
+    the layers stacked on top of it.
+    """
+    for i, layer in enumerate(model.layers):
+        if isinstance(layer, tf.keras.Model):
+            return layer, model.layers[i + 1 :]
+    raise ValueError(f"{model.name} has no nested backbone to split its head from")
+
+
+def _check_backbone_weights(backbone, base_model, name):
+    """
+    Make sure a head was trained on the unmodified ImageNet backbone.
+
+    A head whose backbone conv weights were fine-tuned expects different
+    features than the shared backbone gives, yet its shapes still fit, so
+    the combined model would silently return wrong classes or grades.
+    """
+    for layer in backbone.layers:
+        weights = layer.get_weights()
+        if not weights:
+            continue
+        try:
+            base_weights = base_model.get_layer(layer.name).get_weights()
+        except ValueError:
+            base_weights = None
+        if base_weights is None or len(base_weights) != len(weights) or not all(
+            a.shape == b.shape and np.allclose(a, b, atol=1e-6)
+            for a, b in zip(weights, base_weights)
+        ):
+            raise ValueError(
+                f"{name} backbone layer {layer.name!r} differs from the ImageNet "
+                "MobileNetV2 weights, so its head cannot share the backbone; "
+                "use INFERENCE_MODE=separate"
+            )
+
+
+def _apply_head(features, backbone, head_layers, name):
+    if tuple(backbone.output.shape[1:]) != tuple(features.shape[1:]):
+        raise ValueError(
+            f"{name} head expects backbone features of shape "
+            f"{tuple(backbone.output.shape[1:])}, shared backbone gives "
+            f"{tuple(features.shape[1:])}"
+        )
+    x = features
+    for layer in head_layers:
+        x = layer(x)
+    return tf.keras.layers.Identity(name=name)(x)
+
+
+def _keras_model(name, path):
+    """The Keras original of a registered model, whichever backend serves it."""
+    model = registry.get(name)
+    if isinstance(model, CompiledModel):
+        return model.model
+    return model if isinstance(model, tf.keras.Model) else load_model(path)
+
+
+def build_multi_head_model():
+    """
+    Build one graph that runs the MobileNetV2 backbone once and feeds the
+    identification, ImageNet and freshness heads from the same features.
+
+    The head layers are shared with the already-loaded separate models, so
+    no weights are copied or retrained. This assumes both heads were
+    trained on a frozen ImageNet backbone; a model whose backbone weights
+    differ from the base model's raises ValueError instead.
+    """
+    base_model = _keras_model("base", identify_object.BASE_MODEL_PATH)
+    features = base_model.get_layer(BACKBONE_OUTPUT_LAYER).output
+
+    # ImageNet head: the original pooling + classifier layers of MobileNetV2
+    imagenet = features
+    past_backbone = False
+    for layer in base_model.layers:
+        if past_backbone:
+            imagenet = layer(imagenet)
+        if layer.name == BACKBONE_OUTPUT_LAYER:
+            past_backbone = True
+    imagenet = tf.keras.layers.Identity(name="imagenet")(imagenet)
+
+    fine_tuned_backbone, fine_tuned_head = _split_head(
+        _keras_model("fine_tuned", identify_object.FINE_TUNED_MODEL_PATH)
+    )
+    _check_backbone_weights(fine_tuned_backbone, base_model, "identification")
+    identification = _apply_head(
+        features, fine_tuned_backbone, fine_tuned_head, "identification"
+    )
+
+    freshness_backbone, freshness_head = _split_head(
+        _keras_model("freshness", freshness_detection.model_path)
+    )
+    _check_backbone_weights(freshness_backbone, base_model, "freshness")
+    freshness = _apply_head(features, freshness_backbone, freshness_head, "freshness")
+
+    return tf.keras.Model(
+        inputs=base_model.input,
+        outputs=[identification, imagenet, freshness],
+        name="multi_head_mobilenet",
+    )
+
+
+def load_multi_head_model():
+    """
+    Load the saved multi-head model, or build it from the separate models.
+
+    A saved model is checked like a fresh build: the current fine-tuned and
+    freshness backbones must match the backbone it was saved with.
+    """
+    if os.path.exists(MULTI_HEAD_MODEL_PATH):
+        model = load_model(MULTI_HEAD_MODEL_PATH)
+        for name, registered, path in (
+            ("identification", "fine_tuned", identify_object.FINE_TUNED_MODEL_PATH),
+            ("freshness", "freshness", freshness_detection.model_path),
+        ):
+            backbone, _ = _split_head(_keras_model(registered, path))
+            _check_backbone_weights(backbone, model, name)
+        return compile_model(model)
+    return compile_model(build_multi_head_model())
+
+
+registry.register("multi_head", load_multi_head_model, warmup_model)
+
+
+def _predict_batch(batch):
+    outputs = registry.get("multi_head").predict(batch, verbose=0)
+    # One (identification, imagenet, freshness) tuple per sample
+    return list(zip(*outputs))
+
+
+multi_head_scheduler = get_scheduler("multi_head", _predict_batch)
+
+
+def analyze_produce(image_array, weight_factor=1.2, top_k=5):
+    """
+    Identify the object and grade its freshness with a single backbone pass.
+
+    Args:
+        image_array (np.array): RGB input image as a NumPy array.
+        weight_factor (float): Factor to weight the base model's confidence.
+        top_k (int): Number of ImageNet predictions to keep.
+
+    Returns:
+        ProduceResult: Identification, ImageNet top-k and freshness results.
+    """
+    return analyze_produce_batch([image_array], weight_factor, top_k)[0]
+
+
+def analyze_produce_batch(images, weight_factor=1.2, top_k=5):
+    """
+    `analyze_produce` for N images. Every row is submitted to the scheduler
+    before any result is awaited, so the rows share batched model calls.
+
+    Returns:
+        list: One ProduceResult per image.
+    """
+    # One resize + preprocess_input shared by all three heads
+    img_batch = identify_object.preprocess_batch(images)
+
+    futures = [multi_head_scheduler.submit(sample) for sample in img_batch]
+    identification, imagenet, freshness = (
+        np.stack(head) for head in zip(*(future.result() for future in futures))
+    )
+
+    choices = identify_object.resolve_image_class_batch(
+        identification, imagenet, weight_factor
+    )
+    tops = identify_object.imagenet_top_k(imagenet, top=top_k)
+    grades = freshness_detection.interpret_freshness_batch(freshness)
+
+    return [
+        ProduceResult(
+            predicted_class=predicted_class,
+            confidence=float(confidence),
+            in_list=bool(in_list),
+            imagenet_top_k=[(label, float(score)) for label, score in top],
+            freshness_class=freshness_class,
+            predicted_probability=float(predicted_probability),
+            adjusted_probability=float(adjusted_probability),
+            freshness_scale=freshness_scale,
+        )
+        for (predicted_class, confidence, in_list), top, (
+            freshness_class,
+            predicted_probability,
+            adjusted_probability,
+            freshness_scale,
+        ) in zip(choices, tops, grades)
+    ]
+
+
+def compare_with_separate_models(image_arrays):
+    """
+    Run every image through the old three-model path and the multi-head path
+    and report prediction agreement and mean latency for each.
+    """
+    report = {
+        "images": len(image_arrays),
+        "class_agreement": 0,
+        "freshness_agreement": 0,
+        "max_adjusted_probability_delta": 0.0,
+        "separate_ms": 0.0,
+        "multi_head_ms": 0.0,
+    }
+    for image_array in image_arrays:
+        start = time.perf_counter()
+        separate_class, _, _ = identify_object.predict_image_class(image_array)
+        separate_freshness = freshness_detection.predict_freshness(image_array)
+        report["separate_ms"] += (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        combined = analyze_produce(image_array)
+        report["multi_head_ms"] += (time.perf_counter() - start) * 1000
+
+        report["class_agreement"] += separate_class == combined.predicted_class
+        report["freshness_agreement"] += (
+            separate_freshness[0] == combined.freshness_class
+        )
+        report["max_adjusted_probability_delta"] = max(
+            report["max_adjusted_probability_delta"],
+            abs(float(separate_freshness[2]) - combined.adjusted_probability),
+        )
+
+    if image_arrays:
+        report["separate_ms"] /= len(image_arrays)
+        report["multi_head_ms"] /= len(image_arrays)
+    return report
+
+
+if __name__ == "__main__":
+    # Usage:
+    #   python -m src.scripts.multi_head_model build
+    #   python -m src.scripts.multi_head_model compare img1.jpg img2.jpg ...
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        build_multi_head_model().save(MULTI_HEAD_MODEL_PATH)
+        print(f"Saved multi-head model to {MULTI_HEAD_MODEL_PATH}")
+    elif command == "compare":
+        images = [np.array(Image.open(path).convert("RGB")) for path in sys.argv[2:]]
+        for key, value in compare_with_separate_models(images).items():
+            print(f"{key}: {value}")
+    else:
+        print(f"Unknown command: {command}")
@@ -3,7 +3,24 @@ import torch
 import torchvision.transforms as T
 import numpy as np
 from easyocr import Reader
+import logging
 import os
+import sys
+import time
+from queue import Queue
+from src.scripts.model_registry import registry
+from src.scripts.metrics import span
+from src.scripts.runtime_config import governor
+
+logger = logging.getLogger(__name__)
+
+# PyTorch (U-Net, EasyOCR) and OpenCV pools sized by the CPU profile
+governor.apply_torch()
+governor.apply_opencv()
+
+# Engines kept loaded for concurrent requests, and text regions recognized per batch
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", "1"))
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "16"))
 
 
 # 1. U-Net model definition
@@ -26,10 +43,10 @@ def load_unet_model():
     model = UNetEnhancer()
     if os.path.exists(MODEL_PATH):
         model.load_state_dict(torch.load(MODEL_PATH, weights_only=True))
-        print("U-Net model loaded from local storage.")
+        logger.info("U-Net model loaded from %s", MODEL_PATH)
     else:
         # Assume you've trained/downloaded U-Net; for now, it's randomly initialized.
-        print("Saving randomly initialized U-Net model.")
+        logger.warning("No U-Net weights at %s; saving a randomly initialized model", MODEL_PATH)
         torch.save(model.state_dict(), MODEL_PATH)
     return model
 
@@ -78,8 +95,76 @@ def perform_ocr(image):
     return detected_text
 
 
+class OCREngine:
+    """
+    Long-lived U-Net + EasyOCR pipeline.
+
+    Both models are loaded once, inference runs under `torch.inference_mode`,
+    and the text regions EasyOCR detects are recognized in batches instead
+    of one at a time.
+    """
+
+    def __init__(self, languages=("en",), batch_size=OCR_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.unet_model = load_unet_model().eval()
+        self.reader = Reader(list(languages), gpu=torch.cuda.is_available())
+
+    def enhance(self, image):
+        with torch.inference_mode():
+            return enhance_image_with_unet(image, self.unet_model)
+
+    def read_text(self, image):
+        with torch.inference_mode():
+            horizontal_list, free_list = self.reader.detect(image)
+            results = self.reader.recognize(
+                image,
+                horizontal_list=horizontal_list[0],
+                free_list=free_list[0],
+                batch_size=self.batch_size,
+            )
+        return [text for (_, text, _) in results]
+
+    def process_image(self, image_array):
+        # Step 1: Preprocess with OpenCV
+        preprocessed_image = preprocess_image(image_array)
+
+        # Step 2: Enhance with U-Net
+        enhanced_image = self.enhance(preprocessed_image)
+
+        # Step 3: Perform OCR and convert list to string
+        return " ".join(self.read_text(enhanced_image))
+
+
+class OCREnginePool:
+    """A fixed number of OCREngines shared by request threads."""
+
+    def __init__(self, size=OCR_POOL_SIZE):
+        self._engines = Queue()
+        for _ in range(max(1, size)):
+            self._engines.put(OCREngine())
+
+    def process_image(self, image_array):
+        engine = self._engines.get()
+        try:
+            return engine.process_image(image_array)
+        finally:
+            self._engines.put(engine)
+
+
+# Loaded on first use, or during warmup when imageResults uses the local engine
+registry.register(
+    "local_ocr", OCREnginePool, eager=os.getenv("OCR_ENGINE", "aws") == "local"
+)
+
+
 # Full processing pipeline
 def process_image(image_array):
+    with span("local_ocr"):
+        return registry.get("local_ocr").process_image(image_array)
+
+
+def process_image_uncached(image_array):
+    """The original pipeline, reloading both models on every call (for benchmarks)."""
     # Step 1: Preprocess with OpenCV
     preprocessed_image = preprocess_image(image_array)
 
@@ -97,16 +182,49 @@ def process_image(image_array):
     return ocr_results
 
 
-if __name__ == "__main__":
+def benchmark(image_array, runs=5):
+    """Per-image latency of the original pipeline vs the persistent engine."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        process_image_uncached(image_array)
+    uncached_ms = (time.perf_counter() - start) * 1000 / runs
 
-    # Example usage
-    image = cv2.imread(
-        "src/scripts/image.jpg"
-    )  # Replace this with your NumPy array input
-    image_array = np.array(image)
-    ocr_output = process_image(image_array)
-    print("............")
-    print(ocr_output)
+    start = time.perf_counter()
+    engine = OCREngine()
+    load_ms = (time.perf_counter() - start) * 1000
+    engine.process_image(image_array)  # first call pays one-off setup
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        engine.process_image(image_array)
+    engine_ms = (time.perf_counter() - start) * 1000 / runs
+
+    return {
+        "uncached_ms": uncached_ms,
+        "engine_load_ms": load_ms,
+        "engine_ms": engine_ms,
+        "speedup": uncached_ms / engine_ms if engine_ms else None,
+    }
+
+
+if __name__ == "__main__":
+    # Usage:
+    #   python -m src.scripts.ocr [image.jpg]
+    #   python -m src.scripts.ocr --benchmark image.jpg [runs]
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        image_array = cv2.imread(sys.argv[2])
+        runs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+        for key, value in benchmark(image_array, runs).items():
+            print(f"{key}: {value}")
+    else:
+        # Example usage
+        image = cv2.imread(
+            sys.argv[1] if len(sys.argv) > 1 else "src/scripts/image.jpg"
+        )  # Replace this with your NumPy array input
+        image_array = np.array(image)
+        ocr_output = process_image(image_array)
+        print("............")
+        print(ocr_output)
 
     # Load image
     # image_path = "data/sample_image.jpg"
@@ -1,41 +1,18 @@
-import boto3
-from PIL import Image
-import datetime
 import dotenv
-import os
+
+from src.scripts.model_registry import registry
+from src.scripts.textract_client import TextractClient
 
 dotenv.load_dotenv()
 
-client = boto3.client(
-    "textract",
-    region_name="us-east-1",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-)
+# One pooled, concurrency-limited client shared by every request, created on
+# first use (or during warmup). TEXTRACT_BACKEND=stub answers offline.
+registry.register("textract", TextractClient)
 
 
 def get_aws_ocr(image_array):
-    # convert the image array to image in rgb format
-    image = Image.fromarray(image_array).convert("RGB")
-
-    # save the image to a byte array
-    imagename = str(datetime.datetime.now()) + "image.jpg"
-    image.save(imagename)
-    with open(imagename, "rb") as file:
-        bytes = bytearray(file.read())
-
-    response = client.detect_document_text(
-        Document={
-            "Bytes": bytes,
-        }
-    )
-
-    text = ""
-    for item in response["Blocks"]:
-        if item["BlockType"] == "LINE":
-            text += item["Text"] + " "
-
-    return text
+    # downscale + JPEG-encode the frame and send it to Textract
+    return registry.get("textract").detect_text(image_array)
 
 
 # # convert image to bytes
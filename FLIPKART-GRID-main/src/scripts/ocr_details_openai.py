@@ -1,8 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, create_model
 from openai import OpenAI
 import os
+import time
 from dotenv import load_dotenv
 from datetime import date
+from src.scripts.label_parser import (
+    LABEL_FAST_PATH_ENABLED,
+    fast_path_stats,
+    parse_date,
+    parse_label_text,
+)
+from src.scripts.metrics import span
+from src.scripts.product_details_cache import product_details_cache
 
 
 load_dotenv()
@@ -38,7 +47,11 @@ def checkExpiryStatus(exp_date: str) -> str:
     """
     # Convert the expiry date string to a date object
     try:
-        exp_date = date.fromisoformat(exp_date)
+        # Accepts ISO as well as the printed dd/mm/yy, mm/yyyy and 'Mar 2024' forms;
+        # a month-only date is good until the end of that month
+        exp_date = parse_date(exp_date, end_of_month=True)
+        if exp_date is None:
+            return "NA"
 
         # Get the current date
         current_date = date.today()
@@ -53,6 +66,44 @@ def checkExpiryStatus(exp_date: str) -> str:
         return "NA"
 
 
+def ask_llm(text: str, fields: list, known: dict) -> dict:
+    """
+    Ask the LLM for `fields` only, passing the fields already read by the
+    label parser as context.
+
+    Returns:
+        dict: The requested fields.
+    """
+    if len(fields) == len(ProductDetails.model_fields):
+        response_format = ProductDetails
+    else:
+        response_format = create_model(
+            "PartialProductDetails", **{name: (str, ...) for name in fields}
+        )
+    system_prompt = "Extract the product information. Give dates in the format dd/mm/yy. Make sure mfg date is before expiry date by analyzing the dates. Use real world knowledge to correct any errors like typos or incorrect dates. I want the product name, brand, pack size, manufacturing date, expiry date, and MRP."
+    if known:
+        system_prompt += f" These fields were already read from the label: {known}. Only return {', '.join(fields)}."
+
+    # Set up the completion request to parse the response into the ProductDetails model
+    start = time.perf_counter()
+    with span("llm"):
+        completion = client.beta.chat.completions.parse(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text},
+            ],
+            response_format=response_format,
+        )
+    fast_path_stats.record_llm(time.perf_counter() - start)
+
+    # Parse the response (returns a Pydantic model instance)
+    parsed_response = completion.choices[0].message.parsed
+
+    # Convert the Pydantic model instance to a dictionary using model_dump()
+    return parsed_response.model_dump()
+
+
 def get_product_details_from_text(text: str) -> dict:
     """
     Extracts product details from a given text using the GPT-4 model and returns them as a dictionary.
@@ -63,26 +114,43 @@ def get_product_details_from_text(text: str) -> dict:
     Returns:
         dict: A dictionary with product details.
     """
-    # Set up the completion request to parse the response into the ProductDetails model
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "Extract the product information. Give dates in the format dd/mm/yy. Make sure mfg date is before expiry date by analyzing the dates. Use real world knowledge to correct any errors like typos or incorrect dates. I want the product name, brand, pack size, manufacturing date, expiry date, and MRP.",
-            },
-            {"role": "user", "content": text},
-        ],
-        response_format=ProductDetails,
-    )
+    # Reuse the details of a label we have already parsed
+    product_details = None
+    if product_details_cache is not None:
+        product_details = product_details_cache.get(text)
+
+    if product_details is None:
+        if LABEL_FAST_PATH_ENABLED:
+            # MRP, dates and pack size usually follow fixed patterns; only the
+            # fields the rules cannot read are left for the LLM
+            start = time.perf_counter()
+            with span("label_parser"):
+                parsed = parse_label_text(text)
+            fast_path_stats.record_parse(parsed, time.perf_counter() - start)
+            product_details = dict(parsed.details)
+            if parsed.answers_alone:
+                # Confident enough without the network; unread fields are NA
+                product_details.update(dict.fromkeys(parsed.missing, "NA"))
+            missing = [] if parsed.answers_alone else parsed.missing
+        else:
+            product_details = {}
+            missing = list(ProductDetails.model_fields)
 
-    # Parse the response (returns a Pydantic model instance)
-    parsed_response = completion.choices[0].message.parsed
+        if missing:
+            product_details.update(ask_llm(text, missing, product_details))
 
-    # Convert the Pydantic model instance to a dictionary using model_dump()
-    product_details = parsed_response.model_dump()
+        if product_details_cache is not None:
+            product_details_cache.put(text, product_details)
+
+    # Keep the ProductDetails field order whichever path filled them
+    product_details = {
+        name: product_details[name]
+        for name in ProductDetails.model_fields
+        if name in product_details
+    }
 
     # add a new key-value pair to the dictionary
+    # (recomputed on every read so cached entries still expire correctly)
     product_details["status"] = checkExpiryStatus(product_details["exp_date"])
 
     return product_details
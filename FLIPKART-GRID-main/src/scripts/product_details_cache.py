@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Set PRODUCT_DETAILS_CACHE=0 to call the LLM for every OCR string
+PRODUCT_DETAILS_CACHE_ENABLED = os.getenv("PRODUCT_DETAILS_CACHE", "1") != "0"
+PRODUCT_DETAILS_CACHE_PATH = os.getenv(
+    "PRODUCT_DETAILS_CACHE_PATH", "product_details_cache.sqlite3"
+)
+PRODUCT_DETAILS_CACHE_TTL_HOURS = float(
+    os.getenv("PRODUCT_DETAILS_CACHE_TTL_HOURS", "168")
+)
+PRODUCT_DETAILS_CACHE_MAX_ROWS = int(os.getenv("PRODUCT_DETAILS_CACHE_MAX_ROWS", "5000"))
+
+# Largest SimHash distance (out of 64 bits) still treated as the same label.
+# A few misread words move the hash by ~5-11 bits, unrelated labels by ~30.
+FUZZY_MAX_DISTANCE = 12
+_MASK = (1 << 64) - 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+
+def _numbers_signature(normalized):
+    """
+    Every digit run in the text. Fuzzy matches must agree on these exactly so
+    two batches of the same SKU with different dates or MRP never collide.
+    """
+    return " ".join(sorted(set(_NUMBER_RE.findall(normalized))))
+
+
+def simhash(normalized):
+    """64-bit SimHash over the character trigrams of each word."""
+    trigrams = [
+        token[i : i + 3]
+        for token in normalized.split()
+        for i in range(len(token) - 2)
+    ]
+    if not trigrams:
+        return 0
+    values = np.array(
+        [
+            int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "big")
+            for gram in trigrams
+        ],
+        dtype=np.uint64,
+    )
+    bits = (values[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    weights = bits.astype(np.int64).sum(axis=0) * 2 - len(trigrams)
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class ProductDetailsCache:
+    """
+    SQLite-backed memo of OCR text -> product details.
+
+    Lookups try the exact normalized text first, then a fuzzy SimHash match
+    that tolerates OCR noise in the words but requires the same numbers.
+    Rows expire after a TTL and the table is trimmed to `max_rows` by least
+    recent use. The `status` field is never stored; callers recompute it
+    from `exp_date` on every read.
+    """
+
+    def __init__(
+        self,
+        path=PRODUCT_DETAILS_CACHE_PATH,
+        ttl_hours=PRODUCT_DETAILS_CACHE_TTL_HOURS,
+        max_rows=PRODUCT_DETAILS_CACHE_MAX_ROWS,
+    ):
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS product_details (
+                text_key TEXT PRIMARY KEY,
+                numbers TEXT NOT NULL,
+                simhash INTEGER NOT NULL,
+                details TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        # Fuzzy candidates must share the exact numbers, so that is the index
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_numbers ON product_details (numbers)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _key(self, normalized):
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+    def get(self, text):
+        """Return cached product details (without `status`) or None."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT text_key, details FROM product_details "
+                "WHERE text_key = ? AND created_at >= ?",
+                (self._key(normalized), cutoff),
+            ).fetchone()
+            fuzzy = False
+
+            if row is None:
+                fingerprint = simhash(normalized)
+                # Newest first, so the strict comparison below keeps the most
+                # recent row among equally close candidates
+                candidates = self._connection.execute(
+                    "SELECT text_key, details, simhash FROM product_details "
+                    "WHERE numbers = ? AND created_at >= ? "
+                    "ORDER BY created_at DESC",
+                    (_numbers_signature(normalized), cutoff),
+                ).fetchall()
+                best_distance = FUZZY_MAX_DISTANCE + 1
+                for text_key, details, candidate in candidates:
+                    distance = bin((candidate & _MASK) ^ fingerprint).count("1")
+                    if distance < best_distance:
+                        row = (text_key, details)
+                        best_distance = distance
+                fuzzy = row is not None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE product_details SET last_used = ? WHERE text_key = ?",
+                (now, row[0]),
+            )
+            self._connection.commit()
+            if fuzzy:
+                self.fuzzy_hits += 1
+            else:
+                self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, text, details):
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+        details = {key: value for key, value in details.items() if key != "status"}
+        fingerprint = simhash(normalized)
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO product_details VALUES "
+                "(?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(normalized),
+                    _numbers_signature(normalized),
+                    _to_signed(fingerprint),
+                    json.dumps(details),
+                    now,
+                    now,
+                ),
+            )
+            self._connection.execute(
+                "DELETE FROM product_details WHERE created_at < ?",
+                (now - self.ttl_seconds,),
+            )
+            self._connection.execute(
+                "DELETE FROM product_details WHERE text_key IN ("
+                "SELECT text_key FROM product_details ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+            self._connection.commit()
+
+    def stats(self):
+        with self._lock:
+            (rows,) = self._connection.execute(
+                "SELECT COUNT(*) FROM product_details"
+            ).fetchone()
+            return {
+                "rows": rows,
+                "hits": self.hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+            }
+
+
+product_details_cache = (
+    ProductDetailsCache() if PRODUCT_DETAILS_CACHE_ENABLED else None
+)
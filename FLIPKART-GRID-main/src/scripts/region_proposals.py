@@ -0,0 +1,125 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from src.scripts.runtime_config import governor
+
+governor.apply_opencv()
+
+# Proposals are computed on a copy this wide; boxes are scaled back to the frame
+PROPOSAL_WIDTH = int(os.getenv("PROPOSAL_WIDTH", "320"))
+# Boxes smaller than this fraction of the frame are noise, larger ones are the tray itself
+PROPOSAL_MIN_AREA = float(os.getenv("PROPOSAL_MIN_AREA", "0.01"))
+PROPOSAL_MAX_AREA = float(os.getenv("PROPOSAL_MAX_AREA", "0.9"))
+PROPOSAL_MAX_ITEMS = int(os.getenv("PROPOSAL_MAX_ITEMS", "12"))
+# Boxes overlapping more than this (intersection over the smaller box) are merged
+PROPOSAL_MERGE_OVERLAP = float(os.getenv("PROPOSAL_MERGE_OVERLAP", "0.5"))
+# Canny thresholds applied to each colour channel
+PROPOSAL_EDGE_LOW = int(os.getenv("PROPOSAL_EDGE_LOW", "30"))
+PROPOSAL_EDGE_HIGH = int(os.getenv("PROPOSAL_EDGE_HIGH", "90"))
+# Context kept around each item, as a fraction of its size
+PROPOSAL_PADDING = float(os.getenv("PROPOSAL_PADDING", "0.08"))
+
+
+def _overlap(a, b):
+    """Intersection over the smaller of two (x, y, w, h) boxes."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2 = min(a[0] + a[2], b[0] + b[2])
+    y2 = min(a[1] + a[3], b[1] + b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    return intersection / min(a[2] * a[3], b[2] * b[3])
+
+
+def _merge(a, b):
+    x1, y1 = min(a[0], b[0]), min(a[1], b[1])
+    x2 = max(a[0] + a[2], b[0] + b[2])
+    y2 = max(a[1] + a[3], b[1] + b[3])
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def _merge_overlapping(boxes, threshold):
+    boxes = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlap(boxes[i], boxes[j]) > threshold:
+                    boxes[i] = _merge(boxes[i], boxes[j])
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def propose_regions(image_array, max_items=PROPOSAL_MAX_ITEMS):
+    """
+    Find the separate items lying on a plain tray or conveyor.
+
+    Colour edges of a downscaled copy are closed into blobs and the outer
+    contour of each blob becomes a box. Boxes that are tiny, cover almost
+    the whole frame, or sit inside another box are dropped or merged.
+
+    Args:
+        image_array (np.array): RGB frame.
+        max_items (int): Largest number of boxes returned (biggest first).
+
+    Returns:
+        list: (x, y, w, h) boxes in full-frame pixels; the whole frame when
+        nothing stands out.
+    """
+    height, width = image_array.shape[:2]
+    scale = min(1.0, PROPOSAL_WIDTH / width)
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    small = cv2.resize(image_array, size, interpolation=cv2.INTER_AREA)
+
+    blurred = cv2.GaussianBlur(small, (5, 5), 0)
+    # Edges in any colour channel, so items the same brightness as the tray still show
+    edges = np.zeros(blurred.shape[:2], dtype=np.uint8)
+    for channel in cv2.split(blurred):
+        edges |= cv2.Canny(channel, PROPOSAL_EDGE_LOW, PROPOSAL_EDGE_HIGH)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
+    blobs = cv2.dilate(cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel), kernel)
+    contours, _ = cv2.findContours(blobs, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    frame_area = small.shape[0] * small.shape[1]
+    boxes = [
+        box
+        for box in (cv2.boundingRect(contour) for contour in contours)
+        if PROPOSAL_MIN_AREA <= box[2] * box[3] / frame_area <= PROPOSAL_MAX_AREA
+    ]
+    boxes = _merge_overlapping(boxes, PROPOSAL_MERGE_OVERLAP)
+    boxes = sorted(boxes, key=lambda box: box[2] * box[3], reverse=True)[:max_items]
+    if not boxes:
+        return [(0, 0, width, height)]
+
+    full_boxes = []
+    for x, y, w, h in boxes:
+        pad_x, pad_y = w * PROPOSAL_PADDING, h * PROPOSAL_PADDING
+        x1 = max(0, int((x - pad_x) / scale))
+        y1 = max(0, int((y - pad_y) / scale))
+        x2 = min(width, int((x + w + pad_x) / scale))
+        y2 = min(height, int((y + h + pad_y) / scale))
+        full_boxes.append((x1, y1, x2 - x1, y2 - y1))
+    return full_boxes
+
+
+def crop_regions(image_array, boxes):
+    """Views (not copies) of the frame for each (x, y, w, h) box."""
+    return [image_array[y : y + h, x : x + w] for x, y, w, h in boxes]
+
+
+if __name__ == "__main__":
+    # Draw the proposals for a frame:
+    #   python -m src.scripts.region_proposals tray.jpg [out.jpg]
+    frame = cv2.cvtColor(cv2.imread(sys.argv[1]), cv2.COLOR_BGR2RGB)
+    boxes = propose_regions(frame)
+    for x, y, w, h in boxes:
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+    output = sys.argv[2] if len(sys.argv) > 2 else "proposals.jpg"
+    cv2.imwrite(output, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    print(f"{len(boxes)} region(s): {boxes} -> {output}")
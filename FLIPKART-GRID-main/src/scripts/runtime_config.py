@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+# off (library defaults), latency, balanced or throughput; see plan_threads
+CPU_PROFILE = os.getenv("CPU_PROFILE", "balanced")
+# Cores this process may run on, e.g. "0-3,8"; empty keeps the inherited set
+CPU_AFFINITY = os.getenv("CPU_AFFINITY", "")
+# Requests analyzed at once; the throughput profile splits the cores between them
+CPU_CONCURRENCY = int(os.getenv("CPU_CONCURRENCY", os.getenv("JOB_WORKERS", "4")))
+
+PROFILES = ("off", "latency", "balanced", "throughput")
+
+# Explicit thread counts win over the profile
+_OVERRIDES = {
+    "tf_intra_op": "TF_INTRA_OP_THREADS",
+    "tf_inter_op": "TF_INTER_OP_THREADS",
+    "torch": "TORCH_THREADS",
+    "opencv": "OPENCV_THREADS",
+}
+
+
+@dataclass
+class ThreadPlan:
+    profile: str
+    cores: int
+    tf_intra_op: int = 0
+    tf_inter_op: int = 0
+    torch: int = 0
+    opencv: int = 0
+
+
+def parse_cores(spec):
+    """Core set for a list like "0-3,8"."""
+    cores = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            cores.update(range(int(first), int(last) + 1))
+        else:
+            cores.add(int(part))
+    return cores
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_threads(profile, cores, concurrency=CPU_CONCURRENCY):
+    """
+    Thread counts for each library on `cores` cores.
+
+    - off: leave every library at its default (each sizes itself to all cores).
+    - latency: one frame at a time; every library may use every core.
+    - balanced: TensorFlow and PyTorch each get half the cores, OpenCV at
+      most four, so a TF batch and an OCR call can run side by side.
+    - throughput: `concurrency` requests at once; each gets an equal slice
+      and the libraries run single-threaded inside it.
+
+    0 means "library default". TF_INTRA_OP_THREADS, TF_INTER_OP_THREADS,
+    TORCH_THREADS and OPENCV_THREADS override individual values.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown CPU_PROFILE {profile!r}; use one of {PROFILES}")
+
+    half = max(1, cores // 2)
+    per_request = max(1, cores // max(1, concurrency))
+    plans = {
+        "off": ThreadPlan(profile, cores),
+        "latency": ThreadPlan(profile, cores, cores, 1, cores, cores),
+        "balanced": ThreadPlan(profile, cores, half, 1, half, min(4, half)),
+        "throughput": ThreadPlan(profile, cores, per_request, 1, per_request, 1),
+    }
+    plan = plans[profile]
+    for field, variable in _OVERRIDES.items():
+        if os.getenv(variable):
+            setattr(plan, field, int(os.getenv(variable)))
+    return plan
+
+
+class RuntimeGovernor:
+    """
+    Sizes the TensorFlow, PyTorch and OpenCV thread pools of this process.
+
+    Left alone, each library starts a pool as large as the machine, so
+    concurrent requests run several times more threads than there are
+    cores. `configure` pins the process (optional) and picks a plan;
+    TensorFlow's pools are sized through its environment variables before
+    it initializes, and each library's `apply_*` call (made where the
+    library is imported) sets the rest.
+    """
+
+    def __init__(self):
+        self.plan = None
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def configure(self, profile=None, affinity=CPU_AFFINITY):
+        profile = profile or CPU_PROFILE
+        if affinity and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, parse_cores(affinity))
+        plan = plan_threads(profile, len(available_cores()))
+
+        # Read by TensorFlow when it creates its thread pools
+        for field, variable in (
+            ("tf_intra_op", "TF_NUM_INTRAOP_THREADS"),
+            ("tf_inter_op", "TF_NUM_INTEROP_THREADS"),
+        ):
+            if getattr(plan, field):
+                os.environ[variable] = str(getattr(plan, field))
+        with self._lock:
+            self.plan = plan
+        return plan
+
+    def _plan(self):
+        if self.plan is None:
+            self.configure()
+        return self.plan
+
+    def _error(self, library, error):
+        with self._lock:
+            self.errors.append(f"{library}: {error}")
+
+    def apply_tensorflow(self):
+        plan = self._plan()
+        if not plan.tf_intra_op:
+            return
+        import tensorflow as tf
+
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(plan.tf_intra_op)
+            tf.config.threading.set_inter_op_parallelism_threads(plan.tf_inter_op)
+        except RuntimeError as e:
+            # The runtime already started; the environment variables still applied if set in time
+            self._error("tensorflow", e)
+
+    def apply_torch(self):
+        plan = self._plan()
+        if not plan.torch:
+            return
+        import torch
+
+        torch.set_num_threads(plan.torch)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError as e:
+            # Only settable before the first inter-op parallel work
+            self._error("torch", e)
+
+    def apply_opencv(self):
+        plan = self._plan()
+        if not plan.opencv:
+            return
+        import cv2
+
+        cv2.setNumThreads(plan.opencv)
+
+    def report(self):
+        """The plan and the thread counts each loaded library actually uses."""
+        actual = {}
+        if "tensorflow" in sys.modules:
+            tf = sys.modules["tensorflow"]
+            actual["tensorflow"] = {
+                "intra_op": tf.config.threading.get_intra_op_parallelism_threads(),
+                "inter_op": tf.config.threading.get_inter_op_parallelism_threads(),
+            }
+        if "torch" in sys.modules:
+            torch = sys.modules["torch"]
+            actual["torch"] = {
+                "threads": torch.get_num_threads(),
+                "interop_threads": torch.get_num_interop_threads(),
+            }
+        if "cv2" in sys.modules:
+            actual["opencv"] = {"threads": sys.modules["cv2"].getNumThreads()}
+        plan = self._plan()
+        with self._lock:
+            return {
+                "plan": asdict(plan),
+                "affinity": available_cores(),
+                "actual": actual,
+                "errors": list(self.errors),
+            }
+
+
+# Shared by every module that imports one of the libraries
+governor = RuntimeGovernor()
+
+
+def _workload():
+    """One request's worth of CPU work: identification, freshness, proposals and OCR enhancement."""
+    from src.scripts.freshness_detection import predict_freshness
+    from src.scripts.identify_object import identify_object
+    from src.scripts.region_proposals import propose_regions
+
+    steps = [identify_object, predict_freshness, propose_regions]
+    try:
+        import torch
+
+        from src.scripts.ocr import UNetEnhancer, enhance_image_with_unet, preprocess_image
+    except ImportError:
+        # No PyTorch/EasyOCR here; the OCR stage is left out
+        return steps
+
+    unet = UNetEnhancer().eval()
+
+    def enhance(frame):
+        with torch.no_grad():
+            enhance_image_with_unet(preprocess_image(frame), unet)
+
+    steps.append(enhance)
+    return steps
+
+
+def _run_profile(iterations, concurrency):
+    """Child process of `benchmark`: time the workload under the current CPU_PROFILE."""
+    os.environ["INFERENCE_BATCHING"] = "0"
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+    steps = _workload()
+
+    def request(i):
+        start = time.perf_counter()
+        for step in steps:
+            step(frames[i % len(frames)])
+        return (time.perf_counter() - start) * 1000
+
+    for i in range(2):
+        request(i)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(request, range(iterations))))
+    wall_seconds = time.perf_counter() - start
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "throughput_per_s": iterations / wall_seconds,
+        "stages": len(steps),
+        **governor.report(),
+    }
+
+
+def benchmark(profiles=PROFILES, concurrency_levels=(1, 4), iterations=40, affinity=""):
+    """
+    Run the workload under every profile and concurrency level.
+
+    Thread pools cannot be resized once a library has started them, so each
+    run gets a fresh process.
+    """
+    results = {}
+    for concurrency in concurrency_levels:
+        for profile in profiles:
+            env = dict(
+                os.environ,
+                CPU_PROFILE=profile,
+                CPU_AFFINITY=affinity,
+                CPU_CONCURRENCY=str(concurrency),
+            )
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "src.scripts.runtime_config", "run",
+                    "--iterations", str(iterations), "--concurrency", str(concurrency),
+                ],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results[f"{profile} x{concurrency}"] = json.loads(output.splitlines()[-1])
+    return results
+
+
+if __name__ == "__main__":
+    # Find the best profile for this machine (or a core subset):
+    #   python -m src.scripts.runtime_config benchmark --concurrency 1 4 8 --cores 0-3
+    parser = argparse.ArgumentParser(description="CPU thread-pool profiles")
+    parser.add_argument("command", choices=["report", "benchmark", "run"])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=PROFILES)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--iterations", type=int, default=40)
+    parser.add_argument("--cores", default="", help="Core list to pin to, e.g. 0-3")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        governor.configure()
+        print(json.dumps(governor.report(), indent=2))
+    elif args.command == "run":
+        governor.configure()
+        print(json.dumps(_run_profile(args.iterations, args.concurrency[0])))
+    else:
+        results = benchmark(args.profiles, args.concurrency, args.iterations, args.cores)
+        cores = next(iter(results.values()))["plan"]["cores"]
+        print(f"{cores} core(s)")
+        for concurrency in args.concurrency:
+            runs = {
+                name: result for name, result in results.items()
+                if name.endswith(f" x{concurrency}")
+            }
+            for name, result in runs.items():
+                print(
+                    f"  {name}: p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, "
+                    f"{result['throughput_per_s']:.1f} req/s"
+                )
+            best = max(runs, key=lambda name: runs[name]["throughput_per_s"])
+            print(f"  best at concurrency {concurrency}: {best.split()[0]}")
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,185 @@
+import os
+import random
+import threading
+import time
+from io import BytesIO
+
+from botocore.exceptions import ClientError
+from PIL import Image
+
+from src.scripts.metrics import span
+
+# "aws" calls Textract, "stub" answers locally so the pipeline runs offline
+TEXTRACT_BACKEND = os.getenv("TEXTRACT_BACKEND", "aws")
+TEXTRACT_MAX_CONNECTIONS = int(os.getenv("TEXTRACT_MAX_CONNECTIONS", "16"))
+TEXTRACT_MAX_CONCURRENCY = int(os.getenv("TEXTRACT_MAX_CONCURRENCY", "8"))
+TEXTRACT_MAX_ATTEMPTS = int(os.getenv("TEXTRACT_MAX_ATTEMPTS", "5"))
+# Labels are downscaled to this longest side and re-encoded until under the target size
+TEXTRACT_MAX_SIDE = int(os.getenv("TEXTRACT_MAX_SIDE", "2000"))
+TEXTRACT_MIN_SIDE = int(os.getenv("TEXTRACT_MIN_SIDE", "1000"))
+TEXTRACT_TARGET_BYTES = int(os.getenv("TEXTRACT_TARGET_BYTES", str(1024 * 1024)))
+
+# Textract limits for synchronous calls
+TEXTRACT_MAX_BYTES = 10 * 1024 * 1024
+TEXTRACT_MAX_DIMENSION = 10000
+
+_THROTTLING_ERRORS = {
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "LimitExceededException",
+    "ServiceUnavailableException",
+    "InternalServerError",
+}
+
+_JPEG_QUALITIES = (85, 75, 65)
+
+
+def encode_for_textract(image_array):
+    """
+    Encode a frame as the smallest JPEG that keeps label text legible.
+
+    The frame is downscaled to TEXTRACT_MAX_SIDE on its longest side, then
+    the JPEG quality is lowered and, if still over TEXTRACT_TARGET_BYTES,
+    the image is shrunk further, never below TEXTRACT_MIN_SIDE. The result
+    always respects Textract's size and dimension limits.
+    """
+    image = Image.fromarray(image_array).convert("RGB")
+    max_side = min(TEXTRACT_MAX_SIDE, TEXTRACT_MAX_DIMENSION)
+
+    while True:
+        if max(image.size) > max_side:
+            scale = max_side / max(image.size)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        for quality in _JPEG_QUALITIES:
+            buffer = BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            payload = buffer.getvalue()
+            if len(payload) <= TEXTRACT_TARGET_BYTES:
+                return payload
+
+        # Still over target: shrink, unless already at the legibility floor
+        if max(image.size) <= TEXTRACT_MIN_SIDE:
+            break
+        max_side = max(TEXTRACT_MIN_SIDE, int(max(image.size) * 0.8))
+
+    if len(payload) > TEXTRACT_MAX_BYTES:
+        raise ValueError(f"Image still {len(payload)} bytes after downscaling")
+    return payload
+
+
+class StubTextract:
+    """
+    Offline stand-in for the boto3 Textract client.
+
+    Answers `detect_document_text` with LINE blocks for `lines` after an
+    optional simulated latency, so the OCR path can run without AWS.
+    """
+
+    def __init__(self, lines=None, latency_ms=None):
+        self.lines = lines or os.getenv(
+            "TEXTRACT_STUB_TEXT", "Sample Product|Brand|MRP Rs 100|01/02/22|29/10/22"
+        ).split("|")
+        if latency_ms is None:
+            latency_ms = float(os.getenv("TEXTRACT_STUB_LATENCY_MS", "0"))
+        self.latency_ms = latency_ms
+
+    def detect_document_text(self, Document):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return {
+            "Blocks": [{"BlockType": "PAGE"}]
+            + [{"BlockType": "LINE", "Text": line} for line in self.lines]
+        }
+
+
+def create_boto3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "textract",
+        region_name="us-east-1",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        config=Config(
+            max_pool_connections=TEXTRACT_MAX_CONNECTIONS,
+            connect_timeout=5,
+            read_timeout=30,
+            tcp_keepalive=True,
+            # Retries are ours (below); adaptive mode still rate-limits on throttling
+            retries={"mode": "adaptive", "total_max_attempts": 1},
+        ),
+    )
+
+
+class TextractClient:
+    """
+    Thread-safe Textract wrapper shared by every station in the process.
+
+    One pooled HTTP client, at most `max_concurrency` calls in flight, and
+    exponential backoff with jitter on throttling and transient errors.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        max_concurrency=TEXTRACT_MAX_CONCURRENCY,
+        max_attempts=TEXTRACT_MAX_ATTEMPTS,
+    ):
+        if client is None:
+            client = StubTextract() if TEXTRACT_BACKEND == "stub" else create_boto3_client()
+        self.client = client
+        self.max_attempts = max_attempts
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttles = 0
+        self.bytes_sent = 0
+
+    def _call(self, payload):
+        for attempt in range(self.max_attempts):
+            try:
+                with self._slots:
+                    return self.client.detect_document_text(Document={"Bytes": payload})
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code not in _THROTTLING_ERRORS:
+                    raise
+                with self._lock:
+                    self.throttles += 1
+                if attempt == self.max_attempts - 1:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                # Full jitter: 0.1 s, 0.2 s, 0.4 s ... capped at 5 s
+                time.sleep(random.uniform(0, min(5.0, 0.1 * 2**attempt)))
+
+    def detect_text(self, image_array):
+        """Run DETECT_DOCUMENT_TEXT on a frame and return its LINE text joined by spaces."""
+        with span("textract_encode"):
+            payload = encode_for_textract(image_array)
+        with self._lock:
+            self.calls += 1
+            self.bytes_sent += len(payload)
+
+        with span("textract"):
+            response = self._call(payload)
+
+        text = ""
+        for item in response["Blocks"]:
+            if item["BlockType"] == "LINE":
+                text += item["Text"] + " "
+        return text
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": type(self.client).__name__,
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttles": self.throttles,
+                "avg_payload_bytes": self.bytes_sent / self.calls if self.calls else 0,
+            }
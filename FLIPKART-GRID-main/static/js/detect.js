@@ -1,11 +1,19 @@
 const video = document.querySelector("#videoElement");
 const captureButton = document.querySelector("#captureButton");
+const emptyButton = document.querySelector("#emptyButton");
 const timerCanvas = document.querySelector("#timerCanvas");
 const ctx = timerCanvas.getContext("2d");
 let detectionInterval = document.querySelector("#interval").value;
 let intervalId;
 let countdown;
 let timeLeft;
+let streamId;
+let streamFrameInFlight = false;
+const socket = io.connect();
+
+// Stream mode sends small frames; the server asks for a full frame when an item settles
+const STREAM_INTERVAL_MS = 200;
+const STREAM_FRAME_WIDTH = 160;
 
 // Function to resize the canvas to match the video size
 function resizeCanvas() {
@@ -55,6 +63,66 @@ function stopAutoCapture() {
   ctx.clearRect(0, 0, timerCanvas.width, timerCanvas.height); // Clear timer display
 }
 
+// Function to start the continuous stream mode
+function startStream() {
+  clearInterval(streamId);
+  streamId = setInterval(sendStreamFrame, STREAM_INTERVAL_MS);
+}
+
+// Function to stop the continuous stream mode
+function stopStream() {
+  clearInterval(streamId);
+  streamFrameInFlight = false;
+}
+
+// Function to send a low-resolution frame to the server's scene gate
+function sendStreamFrame() {
+  // Skip this tick if the previous frame has not been acknowledged yet
+  if (streamFrameInFlight || !video.videoWidth) {
+    return;
+  }
+  streamFrameInFlight = true;
+
+  let canvas = document.createElement("canvas");
+  canvas.width = STREAM_FRAME_WIDTH;
+  canvas.height = Math.round(
+    (video.videoHeight / video.videoWidth) * STREAM_FRAME_WIDTH
+  );
+  canvas.getContext("2d").drawImage(video, 0, 0, canvas.width, canvas.height);
+
+  canvas.toBlob(
+    function (blob) {
+      socket.emit("stream_frame", blob, "image/jpeg", function (ack) {
+        streamFrameInFlight = false;
+        if (ack && ack.capture) {
+          captureFrameOverSocket();
+          showCaptureEffect();
+        }
+      });
+    },
+    "image/jpeg",
+    0.6
+  );
+}
+
+// Function to send a full-resolution frame over the Socket.IO connection
+function captureFrameOverSocket() {
+  let canvas = document.createElement("canvas");
+  canvas.width = video.videoWidth;
+  canvas.height = video.videoHeight;
+  canvas.getContext("2d").drawImage(video, 0, 0, canvas.width, canvas.height);
+
+  canvas.toBlob(
+    function (blob) {
+      socket.emit("frame", blob, "image/jpeg", function (ack) {
+        console.log("Image queued for analysis", ack.job_id);
+      });
+    },
+    "image/jpeg",
+    0.85
+  );
+}
+
 // Function to capture and send the image
 function captureImageAndSend() {
   let canvas = document.createElement("canvas");
@@ -63,19 +131,22 @@ function captureImageAndSend() {
   let ctx = canvas.getContext("2d");
   ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-  // Convert canvas to base64 image
-  let imageData = canvas.toDataURL("image/png");
-
-  // Send the image to the backend
-  fetch("/analyze", {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/x-www-form-urlencoded",
+  // Encode the frame as JPEG and send the raw bytes to the backend
+  canvas.toBlob(
+    function (blob) {
+      fetch("/analyze/frame", {
+        method: "POST",
+        headers: {
+          "Content-Type": "image/jpeg",
+        },
+        body: blob,
+      })
+        .then((response) => response.json())
+        .then((data) => console.log("Image queued for analysis", data.job_id));
     },
-    body: new URLSearchParams({ image: imageData }),
-  })
-    .then((response) => response.json())
-    .then((data) => console.log("Image sent for analysis"));
+    "image/jpeg",
+    0.85
+  );
 }
 
 // Access the camera
@@ -94,14 +165,23 @@ navigator.mediaDevices
 // Handle dropdown change event
 document.querySelector("#interval").addEventListener("change", function () {
   detectionInterval = this.value;
+  stopStream();
 
   if (detectionInterval === "manual") {
     // Show the manual capture button and stop automatic capture
     captureButton.style.display = "block";
+    emptyButton.style.display = "none";
+    stopAutoCapture();
+  } else if (detectionInterval === "stream") {
+    // Hide the manual capture button and let the server decide when to capture
+    captureButton.style.display = "none";
+    emptyButton.style.display = "block";
     stopAutoCapture();
+    startStream();
   } else {
     // Hide the manual capture button and start automatic capture
     captureButton.style.display = "none";
+    emptyButton.style.display = "none";
     startAutoCapture(detectionInterval);
   }
 });
@@ -112,8 +192,15 @@ captureButton.addEventListener("click", function () {
   showCaptureEffect(); // Show capture effect on manual capture
 });
 
+// Handle the empty button: the scene in view is the empty belt or tray
+emptyButton.addEventListener("click", function () {
+  socket.emit("stream_empty");
+});
+
 // Initialize automatic capture on page load if not in manual mode
-if (detectionInterval !== "manual") {
+if (detectionInterval === "stream") {
+  startStream();
+} else if (detectionInterval !== "manual") {
   startAutoCapture(detectionInterval);
 }
 
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the app's modules as `src.*`, like app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing product_details_cache would otherwise create its SQLite file
+os.environ.setdefault("PRODUCT_DETAILS_CACHE", "0")
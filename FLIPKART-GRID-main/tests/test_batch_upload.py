@@ -0,0 +1,95 @@
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.controller import batch_upload
+from src.controller.batch_upload import BatchTooLarge, decode_uploads, iter_uploaded_images
+
+
+class Upload:
+    """The parts of a werkzeug FileStorage the batch reader uses."""
+
+    def __init__(self, filename, data, mimetype="application/octet-stream"):
+        self.filename = filename
+        self.mimetype = mimetype
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+def jpeg(width=64, height=48):
+    buffer = BytesIO()
+    Image.fromarray(np.full((height, width, 3), 128, np.uint8)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def zipped(members):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_multipart_files():
+    files = [Upload("a.jpg", b"a"), Upload("b.png", b"bb")]
+    assert list(iter_uploaded_images(files)) == [("a.jpg", b"a"), ("b.png", b"bb")]
+
+
+def test_zip_body_skips_folders_and_other_files():
+    body = zipped(
+        {
+            "items/a.jpg": b"a",
+            "items/notes.txt": b"text",
+            "__MACOSX/._a.jpg": b"fork",
+            "items/b.webp": b"b",
+        }
+    )
+    images = list(iter_uploaded_images([], body, "application/zip"))
+    assert images == [("items/a.jpg", b"a"), ("items/b.webp", b"b")]
+
+
+def test_zip_inside_multipart_is_prefixed():
+    files = [Upload("tray.zip", zipped({"a.jpg": b"a"}))]
+    assert list(iter_uploaded_images(files)) == [("tray.zip/a.jpg", b"a")]
+
+
+def test_too_many_images(monkeypatch):
+    monkeypatch.setattr(batch_upload, "BATCH_MAX_IMAGES", 2)
+    files = [Upload(f"{i}.jpg", b"x") for i in range(3)]
+    with pytest.raises(BatchTooLarge):
+        list(iter_uploaded_images(files))
+
+
+def test_image_too_large_is_checked_before_inflating(monkeypatch):
+    monkeypatch.setattr(batch_upload, "BATCH_MAX_IMAGE_MB", 1 / 1024)
+    body = zipped({"big.jpg": b"\0" * 2048})
+    with pytest.raises(BatchTooLarge, match="big.jpg"):
+        list(iter_uploaded_images([], body, "application/zip"))
+
+
+def test_total_size_limit(monkeypatch):
+    monkeypatch.setattr(batch_upload, "BATCH_MAX_TOTAL_MB", 3 / 1024)
+    files = [Upload(f"{i}.jpg", b"\0" * 1024) for i in range(4)]
+    with pytest.raises(BatchTooLarge):
+        list(iter_uploaded_images(files))
+
+
+def test_zip_entry_limit(monkeypatch):
+    monkeypatch.setattr(batch_upload, "BATCH_MAX_ZIP_ENTRIES", 2)
+    body = zipped({f"{i}.txt": b"" for i in range(3)})
+    with pytest.raises(BatchTooLarge):
+        list(iter_uploaded_images([], body, "application/zip"))
+
+
+def test_decode_uploads_reports_bad_frames():
+    errors = []
+    decoded = list(decode_uploads([("good.jpg", jpeg()), ("bad.jpg", b"not an image")], errors))
+    assert [name for name, _ in decoded] == ["good.jpg"]
+    assert decoded[0][1].model_input.shape == (224, 224, 3)
+    assert decoded[0][1].size == (64, 48)
+    assert [name for name, _ in errors] == ["bad.jpg"]
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from src.controller.job_queue import JobQueue, QueueFull, ShuttingDown
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.finished_at is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def blocked_queue(**kwargs):
+    """A one-worker queue whose first job holds the worker until released."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def handler(job, value):
+        if value == "block":
+            started.set()
+            release.wait(5)
+        return value
+
+    queue = JobQueue(handler, workers=1, **kwargs)
+    blocker = queue.submit("block")
+    assert started.wait(5)
+    return queue, blocker, release
+
+
+def test_runs_handler():
+    queue = JobQueue(lambda job, a, b: a + b, workers=1)
+    job = wait_for(queue.submit(2, 3))
+    assert job.state == "done"
+    assert job.result == 5
+    assert queue.get(job.id) is job
+    assert queue.stats()["completed"] == 1
+
+
+def test_failed_job_keeps_error():
+    def handler(job):
+        raise RuntimeError("boom")
+
+    queue = JobQueue(handler, workers=1)
+    job = wait_for(queue.submit())
+    assert job.state == "failed"
+    assert job.error == "boom"
+    assert queue.stats()["failed"] == 1
+
+
+def test_full_queue_rejects():
+    queue, _, release = blocked_queue(max_depth=1)
+    queue.submit("waiting")
+    with pytest.raises(QueueFull):
+        queue.submit("rejected")
+    assert queue.stats()["rejected"] == 1
+    release.set()
+
+
+def test_latest_frame_wins():
+    queue, _, release = blocked_queue()
+    older = queue.submit("older", key="camera-1")
+    newer = queue.submit("newer", key="camera-1")
+    release.set()
+    wait_for(newer)
+    assert older.state == "superseded"
+    assert older.superseded_by == newer.id
+    assert newer.result == "newer"
+    assert queue.stats()["superseded"] == 1
+
+
+def test_expired_job_never_runs():
+    queue, _, release = blocked_queue()
+    job = queue.submit("late", deadline=time.perf_counter())
+    release.set()
+    wait_for(job)
+    assert job.state == "expired"
+    assert job.result is None
+    assert queue.stats()["expired"] == 1
+
+
+def test_shutdown_drains_then_refuses():
+    queue, _, release = blocked_queue()
+    job = queue.submit("queued")
+    release.set()
+    assert queue.shutdown(timeout=5)
+    assert job.state == "done"
+    with pytest.raises(ShuttingDown):
+        queue.submit("after")
+
+
+def test_shutdown_times_out_on_stuck_job():
+    queue, _, release = blocked_queue()
+    assert not queue.shutdown(timeout=0.1)
+    release.set()
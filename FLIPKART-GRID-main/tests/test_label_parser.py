@@ -0,0 +1,79 @@
+from datetime import date
+
+from src.scripts.label_parser import (
+    FastPathStats,
+    format_date,
+    parse_date,
+    parse_label_text,
+)
+
+
+def test_full_label_skips_llm():
+    parsed = parse_label_text(
+        "Amul Butter Net Wt 100g MRP Rs 55.00 Mfg 01/02/2024 Exp 01/08/2024"
+    )
+    assert parsed.details == {
+        "mrp": "55.00",
+        "mfg_date": "01/02/24",
+        "exp_date": "01/08/24",
+        "pack_size": "100 g",
+        "brand": "Amul",
+    }
+    assert parsed.missing == ["name"]
+    assert parsed.answers_alone
+
+
+def test_sparse_label_goes_to_llm():
+    parsed = parse_label_text("Net Wt 500 gms")
+    assert parsed.details == {"pack_size": "500 g"}
+    assert not parsed.answers_alone
+
+
+def test_grouped_mrp():
+    assert parse_label_text("MRP Rs 1,299.00 incl of all taxes").details["mrp"] == "1299.00"
+
+
+def test_malformed_mrp_grouping_is_not_truncated():
+    assert "mrp" not in parse_label_text("MRP 1,2345").details
+    assert "mrp" not in parse_label_text("MRP 12,5").details
+
+
+def test_month_only_dates_keep_month_precision():
+    parsed = parse_label_text("Mfg 03/2024 Exp 02/2025")
+    assert parsed.details["mfg_date"] == "03/24"
+    assert parsed.details["exp_date"] == "02/25"
+
+
+def test_shelf_life_gives_expiry():
+    parsed = parse_label_text("PKD 12 MAR 24 Best before 6 months from manufacture")
+    assert parsed.details["mfg_date"] == "12/03/24"
+    assert parsed.details["exp_date"] == "12/09/24"
+
+
+def test_parse_date_formats():
+    assert parse_date("2024-05-01") == date(2024, 5, 1)
+    assert parse_date("Mar 2024") == date(2024, 3, 1)
+    assert parse_date("31/02/24") is None
+    assert parse_date("junk") is None
+
+
+def test_month_only_expiry_runs_to_end_of_month():
+    assert parse_date("02/2025") == date(2025, 2, 1)
+    assert parse_date("02/2025", end_of_month=True) == date(2025, 2, 28)
+
+
+def test_format_date():
+    assert format_date(date(2024, 8, 1)) == "01/08/24"
+    assert format_date(date(2024, 8, 1), day_known=False) == "08/24"
+
+
+def test_fast_path_stats():
+    stats = FastPathStats()
+    stats.record_parse(parse_label_text("Amul Butter 100g MRP 55 Mfg 01/02/2024 Exp 01/08/2024"), 0.001)
+    stats.record_parse(parse_label_text("Net Wt 500 gms"), 0.001)
+    stats.record_llm(0.5)
+    report = stats.stats()
+    assert report["labels"] == 2
+    assert report["skipped_llm"] == 1
+    assert report["partial"] == 1
+    assert report["latency_saved_seconds"] == 0.5
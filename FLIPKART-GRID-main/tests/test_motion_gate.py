@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from src.controller.motion_gate import SceneGate, SceneGates
+
+EMPTY = np.full((48, 64, 3), 30, np.uint8)
+ITEM = np.full((48, 64, 3), 200, np.uint8)
+
+
+def frame_with_box(value):
+    frame = EMPTY.copy()
+    frame[12:36, 16:48] = value
+    return frame
+
+
+def feed(gate, frame, count=5):
+    """Feed the same frame `count` times; returns how many times it triggered."""
+    return sum(gate.update(frame) for _ in range(count))
+
+
+def test_settled_scene_triggers_once():
+    gate = SceneGate(settle_frames=3)
+    assert [gate.update(ITEM) for _ in range(5)] == [False, False, False, True, False]
+
+
+def test_moving_scene_never_triggers():
+    gate = SceneGate()
+    frames = [EMPTY, ITEM] * 5
+    assert not any(gate.update(frame) for frame in frames)
+
+
+def test_same_item_again_is_not_reanalyzed():
+    gate = SceneGate()
+    assert feed(gate, ITEM) == 1
+    gate.update(EMPTY)  # motion, never settles
+    assert feed(gate, ITEM) == 0
+
+
+def test_new_item_triggers():
+    gate = SceneGate()
+    assert feed(gate, frame_with_box(120)) == 1
+    assert feed(gate, frame_with_box(250)) == 1
+    assert gate.triggers == 2
+
+
+def test_item_in_view_at_start_is_analyzed_by_default():
+    gate = SceneGate()
+    assert feed(gate, ITEM) == 1
+
+
+def test_first_background_is_opt_in():
+    gate = SceneGate(background="first")
+    assert feed(gate, EMPTY) == 0
+    assert feed(gate, ITEM) == 1
+    assert gate.background_frames == 1
+
+
+def test_mark_empty_on_settled_scene():
+    gate = SceneGate()
+    assert feed(gate, EMPTY) == 1
+    gate.mark_empty()
+    assert feed(gate, ITEM) == 1
+    # Clearing the belt is not analyzed, and the same item after it counts as new
+    assert feed(gate, EMPTY) == 0
+    assert feed(gate, ITEM) == 1
+    assert gate.background_frames == 1
+
+
+def test_mark_empty_before_scene_settles():
+    gate = SceneGate()
+    gate.mark_empty()
+    assert feed(gate, EMPTY) == 0
+    assert feed(gate, ITEM) == 1
+
+
+def test_background_image(tmp_path):
+    from PIL import Image
+
+    path = tmp_path / "empty.png"
+    Image.fromarray(EMPTY).save(path)
+    gate = SceneGate(background=str(path))
+    assert feed(gate, EMPTY) == 0
+    assert feed(gate, ITEM) == 1
+
+
+def test_gates_are_per_client_and_keep_closed_counts():
+    gates = SceneGates()
+    assert sum(gates.update("a", ITEM) for _ in range(5)) == 1
+    assert sum(gates.update("b", ITEM) for _ in range(5)) == 1
+    gates.remove("a")
+    stats = gates.stats()
+    assert stats["streams"] == 1
+    assert stats["frames"] == 10
+    assert stats["analyzed"] == 2
+    assert stats["skipped_ratio"] == pytest.approx(0.8)
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from src.scripts.product_details_cache import (
+    ProductDetailsCache,
+    normalize_text,
+    simhash,
+)
+
+LABEL = "Amul Butter salted pasteurised 100g MRP 55"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ProductDetailsCache(path=str(tmp_path / "cache.sqlite3"))
+
+
+def test_normalize_text():
+    assert normalize_text("  Amul, BUTTER!\n100g ") == "amul butter 100g"
+
+
+def test_simhash_tolerates_ocr_noise():
+    exact = simhash(normalize_text(LABEL))
+    noisy = simhash(normalize_text("Amul Buttr salted pasteurised 100g MRP 55"))
+    unrelated = simhash(normalize_text("Tata Salt iodised vacuum evaporated 1kg MRP 55"))
+    assert bin(exact ^ noisy).count("1") < bin(exact ^ unrelated).count("1")
+
+
+def test_exact_hit_drops_status(cache):
+    cache.put(LABEL, {"brand": "Amul", "status": "Valid"})
+    assert cache.get(LABEL.upper()) == {"brand": "Amul"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_fuzzy_hit_requires_same_numbers(cache):
+    cache.put(LABEL, {"brand": "Amul"})
+    assert cache.get("Amul Buttr salted pasteurised 100g MRP 55") == {"brand": "Amul"}
+    assert cache.get("Amul Buttr salted pasteurised 100g MRP 60") is None
+    stats = cache.stats()
+    assert stats["fuzzy_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_fuzzy_picks_closest_row(cache):
+    # Both within FUZZY_MAX_DISTANCE of the lookup (11 and 5 bits)
+    cache.put("Amul Buttter saltd pasteurised 100g MRP 55", {"brand": "far"})
+    cache.put("Amul Butter salted pasteurised 100g MRP 55", {"brand": "near"})
+    assert cache.get("Amul Buttor salted pasteurised 100g MRP 55") == {"brand": "near"}
+
+
+def test_fuzzy_tie_prefers_newest_row(cache):
+    cache.put("Amul Butter salted pasteurised 100g MRP 55", {"brand": "old"})
+    time.sleep(0.01)
+    # Same words in another order: same SimHash, different exact key
+    cache.put("pasteurised salted Amul Butter 100g MRP 55", {"brand": "new"})
+    assert cache.get("Amul Buttr salted pasteurised 100g MRP 55") == {"brand": "new"}
+
+
+def test_expired_rows_miss(tmp_path):
+    cache = ProductDetailsCache(path=str(tmp_path / "cache.sqlite3"), ttl_hours=0)
+    cache.put(LABEL, {"brand": "Amul"})
+    time.sleep(0.01)
+    assert cache.get(LABEL) is None
+
+
+def test_trimmed_to_max_rows(tmp_path):
+    cache = ProductDetailsCache(path=str(tmp_path / "cache.sqlite3"), max_rows=2)
+    for i in range(4):
+        cache.put(f"label {i} MRP {i}", {"brand": str(i)})
+        time.sleep(0.01)
+    assert cache.stats()["rows"] == 2
+    assert cache.get("label 3 MRP 3") == {"brand": "3"}
+    assert cache.get("label 0 MRP 0") is None
@@ -0,0 +1,74 @@
+import numpy as np
+
+from src.controller.result_cache import ResultCache, dhash, hamming_distance
+from src.scripts.frame_ingest import IngestedFrame
+
+
+def gradient():
+    row = np.linspace(0, 255, 224).astype(np.uint8)
+    return np.repeat(np.tile(row, (224, 1))[:, :, None], 3, axis=2)
+
+
+def test_dhash_stable_under_noise():
+    rng = np.random.default_rng(0)
+    image = gradient()
+    image[:, ::16] = 255
+    noisy = np.clip(image.astype(np.int16) + rng.integers(-3, 4, image.shape), 0, 255)
+    assert hamming_distance(dhash(image), dhash(noisy.astype(np.uint8))) <= 4
+
+
+def test_dhash_differs_for_different_images():
+    image = gradient()
+    assert hamming_distance(dhash(image), dhash(image[:, ::-1].copy())) > 4
+
+
+def test_near_duplicate_hit():
+    cache = ResultCache(max_distance=4)
+    cache.put(0b1010, {"name": "apple"})
+    assert cache.get(0b1011) == {"name": "apple"}
+    assert cache.get(0b0101_0101_0101) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_scopes_are_separate():
+    cache = ResultCache()
+    cache.put(1, {"name": "apple"}, scope="camera-1")
+    assert cache.get(1, scope="camera-2") is None
+    assert cache.get(1, scope="camera-1") == {"name": "apple"}
+
+
+def test_ttl_expires():
+    cache = ResultCache(ttl_seconds=0)
+    cache.put(1, {"name": "apple"})
+    assert cache.get(1) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_distance=0, max_entries=2, max_scopes=1)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    cache.get(1)
+    cache.put(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    cache.put(4, "d", scope="other")
+    assert cache.stats()["scopes"] == 1
+    assert cache.stats()["evictions"] == 3
+
+
+def test_get_or_compute_skips_shed_results():
+    cache = ResultCache()
+    frame = IngestedFrame(gradient(), (224, 224))
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return {"skipped": "label"} if len(calls) == 1 else {"name": "apple"}
+
+    cache.get_or_compute(frame, compute)
+    assert cache.get_or_compute(frame, compute) == {"name": "apple"}
+    assert cache.get_or_compute(frame, compute) == {"name": "apple"}
+    assert len(calls) == 2